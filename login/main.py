@@ -1,7 +1,14 @@
 from flask import Flask, request, render_template_string, jsonify
 import mysql.connector
 import os
-from mysql.connector import Error
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict, deque
+from mysql.connector import Error, errorcode
+from mysql.connector.errors import PoolError
 
 app = Flask(__name__)
 
@@ -16,62 +23,412 @@ DB_CONFIG = {
     'ssl_verify_cert': False,  # Aiven compatibility
     'autocommit': True,
     'use_unicode': True,
-    'charset': 'utf8mb4'
+    'charset': 'utf8mb4',
+    'sql_mode': 'STRICT_TRANS_TABLES'  # too-long writes fail instead of truncating (see REHASH_QUERY)
 }
 
+# Connection pool settings - each gunicorn worker process gets its own pool
+POOL_CONFIG = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+    'recycle': float(os.environ.get('DB_POOL_RECYCLE', 1800)),  # reconnect connections older than this
+    'ping_interval': float(os.environ.get('DB_POOL_PING_INTERVAL', 30))  # ping connections idle longer than this
+}
+
+class PooledConnection:
+    """MySQL connection owned by a ConnectionPool; close() hands it back"""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.checked_out = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Return the connection to the pool instead of closing it"""
+        if self.checked_out:
+            self._pool.release(self)
+
+    def discard(self):
+        """Close the underlying connection for good"""
+        try:
+            self._connection.close()
+        except Error:
+            pass
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections shared by every route in a worker"""
+
+    def __init__(self, db_config, pool_size=5, max_overflow=10, timeout=10, recycle=1800, ping_interval=30):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.checked_out = 0
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size + max_overflow)
+
+    def acquire(self):
+        """Check out a connection, waiting up to `timeout` seconds for a free slot"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"No database connection available after {self.timeout}s "
+                            f"(pool_size={self.pool_size}, max_overflow={self.max_overflow})")
+        try:
+            connection = self._take_idle()
+            if connection is None:
+                connection = PooledConnection(self, mysql.connector.connect(**self.db_config))
+        except Exception:
+            self._slots.release()
+            raise
+        connection.checked_out = True
+        with self._lock:
+            self.checked_out += 1
+        return connection
+
+    def _take_idle(self):
+        """Pop the most recently used idle connection that is still usable"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            now = time.monotonic()
+            if now - connection.created_at > self.recycle:
+                connection.discard()
+                continue
+            if now - connection.last_used > self.ping_interval:
+                try:
+                    connection.ping(reconnect=False)
+                except Error:
+                    connection.discard()
+                    continue
+            return connection
+
+    def release(self, connection):
+        """Put a connection back; overflow connections beyond pool_size are closed"""
+        connection.checked_out = False
+        connection.last_used = time.monotonic()
+        with self._lock:
+            self.checked_out -= 1
+            keep = len(self._idle) < self.pool_size
+            if keep:
+                self._idle.append(connection)
+        if not keep:
+            connection.discard()
+        self._slots.release()
+
+    def status(self):
+        """Pool counters for the health endpoint"""
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'idle': len(self._idle),
+                'checked_out': self.checked_out
+            }
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return this worker's connection pool, creating it on first use (and after fork)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+                _pool_pid = os.getpid()
+    return _pool
+
 def get_db_connection():
-    """Create and return a database connection"""
+    """Check out a pooled database connection; close() returns it to the pool"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
+        return get_pool().acquire()
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
 
+# Short-lived cache of /api/login results (LOGIN_CACHE_TTL=0 disables it)
+LOGIN_CACHE_CONFIG = {
+    'ttl': float(os.environ.get('LOGIN_CACHE_TTL', 0)),  # seconds a result is reused
+    'max_entries': int(os.environ.get('LOGIN_CACHE_SIZE', 1024))
+}
+
+class CredentialCache:
+    """Bounded LRU+TTL cache of login results keyed on a salted hash of the credentials"""
+
+    def __init__(self, ttl=0, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._salt = os.urandom(16)  # per process, so keys are useless outside this worker
+        self._entries = OrderedDict()  # key -> (expires_at, result, user)
+        self._keys_by_user = {}  # lowercased username -> keys, for invalidation
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _key(self, *fields):
+        digest = hashlib.blake2b(key=self._salt, digest_size=16)
+        for field in fields:
+            data = (field or '').encode('utf-8')
+            digest.update(len(data).to_bytes(4, 'big') + data)
+        return digest.digest()
+
+    def get(self, username, password, email=None, phone=None):
+        """Return the cached result for these credentials, or None on a miss"""
+        if not self.enabled:
+            return None
+        key = self._key(username, password, email, phone)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, username, password, email, phone, result):
+        """Remember a login result for `ttl` seconds"""
+        if not self.enabled:
+            return
+        key = self._key(username, password, email, phone)
+        user = username.lower()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result, user)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, user = self._entries.pop(key)
+        keys = self._keys_by_user.get(user)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user]
+
+    def invalidate_user(self, username):
+        """Drop every cached result for a user - call this when their password changes"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(username.lower(), ())):
+                self._remove(key)
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        """Cache counters for the health endpoint"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+credential_cache = CredentialCache(**LOGIN_CACHE_CONFIG)
+
+def invalidate_credentials(username):
+    """Invalidation hook for password changes: forget cached logins for username"""
+    credential_cache.invalidate_user(username)
+
+# Password hashing - scrypt cost parameters for stored hashes (n must be a power of two)
+PASSWORD_HASH_CONFIG = {
+    'n': int(os.environ.get('PASSWORD_SCRYPT_N', 16384)),  # CPU/memory cost
+    'r': int(os.environ.get('PASSWORD_SCRYPT_R', 8)),  # block size
+    'p': int(os.environ.get('PASSWORD_SCRYPT_P', 1))  # parallelism
+}
+
+# Hashing runs in the request thread, at most max_pending at once per worker
+# (hashlib.scrypt releases the GIL, so threaded workers hash concurrently).
+# This semaphore replaces a bounded hashing thread pool: a sync worker would
+# block on the pool's result anyway. Only new_login/asgi.py keeps such a pool.
+HASH_POOL_CONFIG = {
+    'max_pending': int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64)),  # running + waiting hashes
+    'timeout': float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # seconds to wait for a free slot
+}
+
+def _scrypt(password, salt, n, r, p, dklen=32):
+    # OpenSSL's default 32 MiB memory cap is too small for n >= 2**15
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2) + (1 << 20), dklen=dklen)
+
+def hash_password(password, n=None, r=None, p=None):
+    """Hash a password as scrypt$n$r$p$salt$key using the configured cost"""
+    n = n or PASSWORD_HASH_CONFIG['n']
+    r = r or PASSWORD_HASH_CONFIG['r']
+    p = p or PASSWORD_HASH_CONFIG['p']
+    salt = os.urandom(16)
+    key = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${base64.b64encode(salt).decode()}${base64.b64encode(key).decode()}"
+
+def verify_password(password, stored):
+    """Check a password against a stored value, returning (matches, needs_rehash)
+
+    Rows that still hold a plaintext password are compared in constant time
+    and always need a rehash, so they migrate lazily on the next login.
+    """
+    if stored is None:
+        return False, False
+    if isinstance(stored, bytes):
+        stored = stored.decode('utf-8')
+    if not stored.startswith('scrypt$'):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8')), True
+    try:
+        _, n, r, p, salt, expected = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        salt = base64.b64decode(salt)
+        expected = base64.b64decode(expected)
+        # scrypt rejects malformed parameters (n not a power of two, bad r/p)
+        matches = hmac.compare_digest(_scrypt(password, salt, n, r, p, len(expected)), expected)
+    except (ValueError, TypeError, OverflowError):
+        return False, False
+    current = (PASSWORD_HASH_CONFIG['n'], PASSWORD_HASH_CONFIG['r'], PASSWORD_HASH_CONFIG['p'])
+    return matches, matches and (n, r, p) != current
+
+_hash_slots = None
+_hash_slots_pid = None
+_hash_lock = threading.Lock()
+_dummy_hash = None
+
+def run_hashing(fn, *args):
+    """Run a hashing call in the request thread, bounded by this worker's hashing slots
+
+    Handing the call to a thread pool would gain nothing here: a sync
+    worker would block on the result all the same.
+    """
+    global _hash_slots, _hash_slots_pid
+    if _hash_slots is None or _hash_slots_pid != os.getpid():
+        with _hash_lock:
+            if _hash_slots is None or _hash_slots_pid != os.getpid():
+                _hash_slots = threading.BoundedSemaphore(HASH_POOL_CONFIG['max_pending'])
+                _hash_slots_pid = os.getpid()
+    slots = _hash_slots
+    if not slots.acquire(timeout=HASH_POOL_CONFIG['timeout']):
+        raise RuntimeError("Password hashing is saturated")
+    try:
+        return fn(*args)
+    finally:
+        slots.release()
+
+def find_password_match(password, stored_values):
+    """Verify a password against candidate stored values (see run_hashing)
+
+    Returns (index of the first match or None, needs_rehash). With no
+    candidates a dummy hash is still checked, so unknown usernames take as
+    long as wrong passwords.
+    """
+    global _dummy_hash
+    if not stored_values:
+        if _dummy_hash is None:
+            _dummy_hash = run_hashing(hash_password, base64.b64encode(os.urandom(16)).decode())
+        run_hashing(verify_password, password, _dummy_hash)
+        return None, False
+    for index, stored in enumerate(stored_values):
+        matches, needs_rehash = run_hashing(verify_password, password, stored)
+        if matches:
+            return index, needs_rehash
+    return None, False
+
+# Login lookup - one indexed round trip covers both exact and case-insensitive
+# matches, since every exact match is also a match on user_name_lower
+# (run migrate.py once to create the column and its index). The password is
+# verified in Python against the stored hash, not in the WHERE clause.
+LOGIN_QUERY = "SELECT user_name, password FROM User_info WHERE user_name_lower = LOWER(%s) LIMIT 5"
+# Fallback for databases that have not been migrated yet (full table scan)
+LOGIN_QUERY_LEGACY = "SELECT user_name, password FROM User_info WHERE LOWER(user_name) = LOWER(%s) LIMIT 5"
+# Compare-and-set, so a concurrent password change is never overwritten. Under
+# STRICT_TRANS_TABLES a hash too long for the column fails instead of being
+# truncated, and the old value stays in place.
+REHASH_QUERY = "UPDATE User_info SET password = %s WHERE user_name = %s AND password = %s"
+
+# Flipped off the first time the user_name_lower column turns out to be missing
+use_lower_column = True
+# Flipped off the first time the password column turns out too narrow for a hash
+rehash_passwords = True
+
 def validate_user(username, password):
-    """Validate user credentials against existing database"""
+    """Validate user credentials against existing database (None if the database failed)"""
+    global use_lower_column, rehash_passwords
     connection = get_db_connection()
     if not connection:
         print("No database connection available")
-        return False
+        return None
     
+    cursor = None
     try:
         cursor = connection.cursor()
         
-        # First, let's see what's actually in the database
-        print(f"Attempting to validate user: '{username}' with password: '{password}'")
-        
-        # Debug: Check all users in the table
-        cursor.execute("SELECT user_name, password FROM User_info")
-        all_users = cursor.fetchall()
-        print(f"All users in database: {all_users}")
+        print(f"Attempting to validate user: '{username}'")
         
-        # Query your exact table and column names
-        query = "SELECT user_name, password FROM User_info WHERE user_name = %s AND password = %s"
-        cursor.execute(query, (username, password))
-        result = cursor.fetchone()
+        if use_lower_column:
+            try:
+                cursor.execute(LOGIN_QUERY, (username,))
+            except Error as e:
+                if e.errno != errorcode.ER_BAD_FIELD_ERROR:
+                    raise
+                print("Column user_name_lower is missing - run migrate.py to index logins")
+                use_lower_column = False
+        if not use_lower_column:
+            cursor.execute(LOGIN_QUERY_LEGACY, (username,))
+        rows = cursor.fetchall()
         
-        print(f"Query result: {result}")
+        # Try the exact-case username first
+        rows.sort(key=lambda row: row[0] != username)
+        match, needs_rehash = find_password_match(password, [row[1] for row in rows])
         
-        if result:
+        if match is None:
+            print("No matching user found")
+            return False
+        user_name, stored = rows[match]
+        if user_name == username:
             print("User validation successful!")
-            return True
         else:
-            # Try case-insensitive search
-            query_case = "SELECT user_name, password FROM User_info WHERE LOWER(user_name) = LOWER(%s) AND password = %s"
-            cursor.execute(query_case, (username, password))
-            result_case = cursor.fetchone()
-            
-            if result_case:
-                print("User validation successful (case-insensitive)!")
-                return True
-            else:
-                print("No matching user found")
-                return False
+            print("User validation successful (case-insensitive)!")
+        
+        if needs_rehash and rehash_passwords:
+            # Lazy migration: store the password under the current scrypt cost
+            try:
+                cursor.execute(REHASH_QUERY, (run_hashing(hash_password, password), user_name, stored))
+                print(f"Rehashed password for user: '{user_name}'")
+            except Error as e:
+                print(f"Could not rehash password: {e}")
+                if e.errno == errorcode.ER_DATA_TOO_LONG:
+                    print("Column password is too narrow for scrypt hashes - run migrate.py to widen it")
+                    rehash_passwords = False
+        return True
                 
     except Error as e:
         print(f"Error validating user: {e}")
-        return False
+        return None
+    except RuntimeError as e:
+        print(f"Error verifying password: {e}")
+        return None
     finally:
         if cursor:
             cursor.close()
@@ -143,7 +500,7 @@ def login():
                                     message="Please enter both username and password", 
                                     message_type="error")
     
-    # First check if we can connect to database
+    # First check if we can connect to database (a pool checkout, so validate_user reuses this connection)
     connection = get_db_connection()
     if not connection:
         return render_template_string(LOGIN_TEMPLATE, 
@@ -176,7 +533,13 @@ def api_login():
     username = data['username']
     password = data['password']
     
-    if validate_user(username, password):
+    valid = credential_cache.get(username, password)
+    if valid is None:
+        valid = validate_user(username, password)
+        if valid is not None:  # never cache database failures
+            credential_cache.put(username, password, None, None, valid)
+    
+    if valid:
         return jsonify({'success': True, 'message': f'Login successful for {username}'})
     else:
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
@@ -227,6 +590,9 @@ def debug_info():
     except Error as e:
         connection.close()
         return jsonify({'error': str(e)}), 500
+
+@app.route('/health')
+def health_check():
     """Health check endpoint"""
     connection = get_db_connection()
     if connection:
@@ -239,7 +605,9 @@ def debug_info():
             return jsonify({
                 'status': 'healthy', 
                 'database': 'connected',
-                'users_count': count
+                'users_count': count,
+                'pool': get_pool().status(),
+                'login_cache': credential_cache.stats()
             })
         except Error as e:
             connection.close()
@@ -249,7 +617,8 @@ def debug_info():
                 'error': str(e)
             }), 500
     else:
-        return jsonify({'status': 'unhealthy', 'database': 'disconnected'}), 500
+        return jsonify({'status': 'unhealthy', 'database': 'disconnected',
+                        'pool': get_pool().status(), 'login_cache': credential_cache.stats()}), 500
 
 # Initialize database connection check on startup
 if __name__ == '__main__':
@@ -0,0 +1,362 @@
+"""ASGI entry point for new_login.
+
+Serves the same routes as main.py (/, /login, /api/login, /debug, /health)
+with Starlette on an async aiomysql pool, so a single process keeps thousands
+of logins waiting on the database instead of blocking one sync worker each:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8080
+    gunicorn -k uvicorn.workers.UvicornWorker -w 2 asgi:app
+
+Configuration is shared with main.py (DB_*, DB_POOL_*, LOGIN_CACHE_*,
+PASSWORD_* environment variables). aiomysql has no server-side prepared
+statements, so the query shapes from login_queries() are sent as text.
+"""
+import asyncio
+import logging
+import os
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import aiomysql
+from jinja2 import Environment
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse
+from starlette.routing import Route
+
+from main import (DB_CONFIG, HASH_POOL_CONFIG, LOGIN_CACHE_CONFIG, LOGIN_TEMPLATE, POOL_CONFIG, REHASH_QUERY,
+                  CredentialCache, hash_password, login_queries, safe_convert_to_json, verify_password)
+
+logger = logging.getLogger(__name__)
+
+login_template = Environment(autoescape=True).from_string(LOGIN_TEMPLATE)
+
+credential_cache = CredentialCache(**LOGIN_CACHE_CONFIG)
+
+db_pool = None
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_POOL_CONFIG['workers'], thread_name_prefix='password-hash')
+_hash_slots = None
+_dummy_hash = None
+
+def render(status_code=200, form=None, **context):
+    """Render the login page; `form` stands in for request.form in the template"""
+    html = login_template.render(request=SimpleNamespace(form=form or {}), **context)
+    return HTMLResponse(html, status_code=status_code)
+
+def db_config_info():
+    return {
+        'host': os.environ.get('DB_HOST', 'Not set'),
+        'port': os.environ.get('DB_PORT', 'Not set'),
+        'database': os.environ.get('DB_NAME', 'Not set'),
+        'user': os.environ.get('DB_USER', 'Not set')
+    }
+
+async def create_db_pool():
+    """Create the aiomysql pool from the same settings as the sync pool"""
+    ssl_context = None
+    if not DB_CONFIG.get('ssl_disabled'):
+        ssl_context = ssl.create_default_context()
+        if not DB_CONFIG.get('ssl_verify_cert'):
+            ssl_context.check_hostname = False  # Aiven compatibility
+            ssl_context.verify_mode = ssl.CERT_NONE
+    return await aiomysql.create_pool(
+        host=DB_CONFIG['host'],
+        port=DB_CONFIG['port'],
+        db=DB_CONFIG['database'],
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'] or '',
+        ssl=ssl_context,
+        autocommit=True,
+        charset=DB_CONFIG['charset'],
+        connect_timeout=DB_CONFIG['connect_timeout'],
+        init_command=f"SET sql_mode = '{DB_CONFIG['sql_mode']}'",
+        minsize=0,  # connect lazily, so the app starts even if the database is down
+        maxsize=POOL_CONFIG['pool_size'] + POOL_CONFIG['max_overflow'],
+        pool_recycle=int(POOL_CONFIG['recycle']))
+
+@asynccontextmanager
+async def db_connection():
+    """Check out a pooled connection, waiting at most DB_POOL_TIMEOUT seconds"""
+    connection = await asyncio.wait_for(db_pool.acquire(), POOL_CONFIG['timeout'])
+    try:
+        yield connection
+    finally:
+        await db_pool.release(connection)
+
+def pool_status():
+    """Pool counters for the health endpoint"""
+    if db_pool is None:
+        return {}
+    return {
+        'pool_size': db_pool.maxsize,
+        'idle': db_pool.freesize,
+        'checked_out': db_pool.size - db_pool.freesize
+    }
+
+class AsyncSchemaCache:
+    """Async twin of main.SchemaCache: cached DESCRIBE, reloaded after `ttl` seconds or on error"""
+
+    def __init__(self, table, ttl=300):
+        self.table = table
+        self.ttl = ttl
+        self._columns = None
+        self._loaded_at = 0
+
+    async def columns(self, connection):
+        """Return the cached column descriptions, reloading them if stale"""
+        # Concurrent reloads are harmless (same result), so no lock is taken
+        if self._columns is None or time.monotonic() - self._loaded_at > self.ttl:
+            async with connection.cursor() as cursor:
+                await cursor.execute(f"DESCRIBE {self.table}")
+                rows = await cursor.fetchall()
+            self._columns = [{'Field': safe_convert_to_json(col[0]),
+                              'Type': safe_convert_to_json(col[1]),
+                              'Null': safe_convert_to_json(col[2]),
+                              'Key': safe_convert_to_json(col[3])} for col in rows]
+            self._loaded_at = time.monotonic()
+            logger.info(f"Loaded {self.table} schema: {sorted(col['Field'] for col in self._columns)}")
+        return self._columns
+
+    async def column_names(self, connection):
+        """Return the set of column names"""
+        return frozenset(col['Field'] for col in await self.columns(connection))
+
+    def invalidate(self):
+        """Force a reload on next use, e.g. after a query failed"""
+        self._columns = None
+
+schema_cache = AsyncSchemaCache('User_info', ttl=float(os.environ.get('DB_SCHEMA_CACHE_TTL', 300)))
+
+async def run_hashing(fn, *args):
+    """Run a hashing call on the bounded thread pool without blocking the event loop"""
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), HASH_POOL_CONFIG['timeout'])
+    except asyncio.TimeoutError:
+        raise RuntimeError("Password hashing pool is saturated")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_slots.release()
+
+async def find_password_match(password, stored_values):
+    """Async twin of main.find_password_match"""
+    global _dummy_hash
+    if not stored_values:
+        if _dummy_hash is None:
+            _dummy_hash = await run_hashing(hash_password, os.urandom(16).hex())
+        await run_hashing(verify_password, password, _dummy_hash)
+        return None, False
+    for index, stored in enumerate(stored_values):
+        matches, needs_rehash = await run_hashing(verify_password, password, stored)
+        if matches:
+            return index, needs_rehash
+    return None, False
+
+async def validate_user(username, password, email='', phone=''):
+    """Validate user credentials; None instead of False when the database failed"""
+    logger.info(f"Attempting to validate user: '{username}'")
+    try:
+        async with db_connection() as connection:
+            columns = await schema_cache.column_names(connection)
+            if (email and 'email' not in columns) or (phone and 'phone' not in columns):
+                logger.warning("User_info has no email/phone column to verify against")
+                return False
+
+            query = login_queries(columns)[(bool(email), bool(phone))]
+            params = [username] + [value for value in (email, phone) if value]
+            async with connection.cursor() as cursor:
+                await cursor.execute(query, params)
+                rows = list(await cursor.fetchall())
+
+            # Try the exact-case username first, verifying on the hashing pool
+            rows.sort(key=lambda row: row[1] != username)
+            match, needs_rehash = await find_password_match(password, [row[2] for row in rows])
+            if match is None:
+                logger.info("No matching user found")
+                return False
+            user_id, user_name, stored = rows[match]
+            logger.info("User validation successful!")
+
+            if needs_rehash:
+                # Lazy migration: store the password under the current scrypt cost
+                try:
+                    async with connection.cursor() as cursor:
+                        await cursor.execute(REHASH_QUERY, (await run_hashing(hash_password, password), user_id, stored))
+                    logger.info(f"Rehashed password for user: '{user_name}'")
+                except aiomysql.Error as e:
+                    logger.warning(f"Could not rehash password: {e}")
+            return True
+    except (aiomysql.Error, asyncio.TimeoutError, OSError) as e:
+        logger.error(f"Database error validating user: {e}")
+        schema_cache.invalidate()
+        return None
+    except RuntimeError as e:
+        logger.error(f"Error verifying password: {e}")
+        return None
+
+async def index(request):
+    """Display login form"""
+    return render()
+
+async def login(request):
+    """Handle login form submission"""
+    form = await request.form()
+    username = form.get('username', '').strip()
+    password = form.get('password', '').strip()
+    email = form.get('email', '').strip()
+    phone = form.get('phone', '').strip()
+
+    if not username or not password:
+        return render(form=form, message="Please enter both username and password", message_type="error")
+
+    valid = await validate_user(username, password, email, phone)
+    if valid is None:
+        return render(form=form, message_type="error",
+                      message="Database connection failed. Please check your environment variables and try again.")
+    if valid:
+        verification_details = []
+        if email:
+            verification_details.append(f"email ({email})")
+        if phone:
+            verification_details.append(f"phone ({phone})")
+        success_message = f"Login successful! Welcome, {username}!"
+        if verification_details:
+            success_message += f" Additional verification passed for: {', '.join(verification_details)}"
+        logger.info(f"Successful login for user: {username}")
+        return render(form=form, message=success_message, message_type="success")
+
+    error_message = "Invalid credentials. Please check your username and password."
+    if email:
+        error_message += " Email verification also failed."
+    if phone:
+        error_message += " Phone verification also failed."
+    logger.warning(f"Failed login attempt for user: {username}")
+    return render(form=form, message=error_message, message_type="error")
+
+async def api_login(request):
+    """API endpoint for login validation"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not data:
+        return JSONResponse({'success': False, 'message': 'No JSON data provided'}, status_code=400)
+    if 'username' not in data or 'password' not in data:
+        return JSONResponse({'success': False, 'message': 'Username and password required'}, status_code=400)
+
+    username = data['username'].strip()
+    password = data['password'].strip()
+    email = data.get('email', '').strip()
+    phone = data.get('phone', '').strip()
+    if not username or not password:
+        return JSONResponse({'success': False, 'message': 'Username and password cannot be empty'}, status_code=400)
+
+    valid = credential_cache.get(username, password, email, phone)
+    if valid is None:
+        valid = await validate_user(username, password, email, phone)
+        if valid is None:
+            return JSONResponse({'success': False, 'message': 'Internal server error'}, status_code=500)
+        credential_cache.put(username, password, email, phone, valid)
+
+    if valid:
+        verification_info = [name for name, value in (('email', email), ('phone', phone)) if value]
+        message = f'Login successful for {username}'
+        if verification_info:
+            message += f' with additional verification: {", ".join(verification_info)}'
+        logger.info(f"API login successful for user: {username}")
+        return JSONResponse({'success': True, 'message': message})
+    logger.warning(f"API login failed for user: {username}")
+    return JSONResponse({'success': False, 'message': 'Invalid credentials'}, status_code=401)
+
+async def debug_info(request):
+    """Debug endpoint to check database connection and data"""
+    try:
+        async with db_connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SHOW TABLES")
+                tables = await cursor.fetchall()
+                columns = await schema_cache.columns(connection)
+                await cursor.execute("SELECT user_id, user_name, 'HIDDEN' as password, email, phone FROM User_info LIMIT 5")
+                sample_data = await cursor.fetchall()
+                await cursor.execute("SELECT COUNT(*) FROM User_info")
+                user_count = (await cursor.fetchone())[0]
+    except (aiomysql.Error, asyncio.TimeoutError, OSError) as e:
+        logger.error(f"Debug endpoint database error: {e}")
+        schema_cache.invalidate()
+        return JSONResponse({'error': f'Database error: {str(e)}', 'db_config': db_config_info()}, status_code=500)
+
+    return JSONResponse({
+        'database_connected': True,
+        'tables': [safe_convert_to_json(table[0]) for table in tables],
+        'user_info_columns': columns,
+        'sample_users': [{'user_id': safe_convert_to_json(row[0]),
+                          'user_name': safe_convert_to_json(row[1]),
+                          'password': safe_convert_to_json(row[2]),
+                          'email': safe_convert_to_json(row[3]),
+                          'phone': safe_convert_to_json(row[4])} for row in sample_data],
+        'total_users': safe_convert_to_json(user_count),
+        'db_config': db_config_info()
+    })
+
+async def health_check(request):
+    """Health check endpoint"""
+    try:
+        async with db_connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT COUNT(*) FROM User_info")
+                count = (await cursor.fetchone())[0]
+    except (aiomysql.Error, asyncio.TimeoutError, OSError) as e:
+        logger.error(f"Health check database error: {e}")
+        return JSONResponse({
+            'status': 'unhealthy',
+            'database': 'disconnected',
+            'error': str(e),
+            'pool': pool_status(),
+            'login_cache': credential_cache.stats()
+        }, status_code=500)
+    return JSONResponse({
+        'status': 'healthy',
+        'database': 'connected',
+        'users_count': safe_convert_to_json(count),
+        'pool': pool_status(),
+        'login_cache': credential_cache.stats()
+    })
+
+async def not_found(request, exc):
+    """Handle 404 errors"""
+    return JSONResponse({'error': 'Endpoint not found'}, status_code=404)
+
+async def internal_error(request, exc):
+    """Handle 500 errors"""
+    logger.error(f"Internal server error: {exc}")
+    return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+async def startup():
+    global db_pool, _hash_slots
+    _hash_slots = asyncio.Semaphore(HASH_POOL_CONFIG['max_pending'])
+    db_pool = await create_db_pool()
+    logger.info("Async database pool created")
+
+async def shutdown():
+    if db_pool is not None:
+        db_pool.close()
+        await db_pool.wait_closed()
+    _hash_executor.shutdown(wait=False)
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/login', login, methods=['POST']),
+        Route('/api/login', api_login, methods=['POST']),
+        Route('/debug', debug_info),
+        Route('/health', health_check),
+    ],
+    exception_handlers={404: not_found, 500: internal_error},
+    on_startup=[startup],
+    on_shutdown=[shutdown])
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
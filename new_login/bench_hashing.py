@@ -0,0 +1,56 @@
+"""Benchmark password verification throughput at several scrypt cost settings.
+
+For each cost, measures logins/sec on one thread and through a thread pool
+with one worker per core (hashlib.scrypt releases the GIL), and reports the
+per-core rate:
+
+    python bench_hashing.py
+    python bench_hashing.py --costs 14 15 16 --seconds 3
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from main import hash_password, verify_password
+
+def rate(verify_many, seconds):
+    """Verifications per second of verify_many(batch) over roughly `seconds`"""
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        done += verify_many()
+    return done / (time.perf_counter() - start)
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--costs', nargs='*', type=int, default=[12, 13, 14, 15, 16],
+                        help='log2 of the scrypt n parameter')
+    parser.add_argument('--r', type=int, default=8)
+    parser.add_argument('--p', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"{cores} cores, r={args.r}, p={args.p}")
+    print(f"{'n':>8} {'ms/verify':>10} {'1 thread/s':>11} {f'{cores} threads/s':>13} {'per core/s':>11}")
+    with ThreadPoolExecutor(max_workers=cores) as executor:
+        for log_n in args.costs:
+            stored = hash_password('correct horse', n=2 ** log_n, r=args.r, p=args.p)
+
+            def verify_one():
+                verify_password('correct horse', stored)
+                return 1
+
+            def verify_parallel():
+                futures = [executor.submit(verify_password, 'correct horse', stored) for _ in range(cores)]
+                for future in futures:
+                    future.result()
+                return cores
+
+            single = rate(verify_one, args.seconds)
+            parallel = rate(verify_parallel, args.seconds)
+            print(f"{2 ** log_n:>8} {1000 / single:>10.1f} {single:>11.1f} {parallel:>13.1f} {parallel / cores:>11.1f}")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,108 @@
+"""Benchmark login lookups: old two-query path vs the single indexed query.
+
+Builds a scratch copy of User_info (User_info_bench) with the given number of
+users in the database configured through the usual DB_* environment
+variables, then times hits and misses for both strategies:
+
+    python bench_lookup.py              # 10k and 1M users
+    python bench_lookup.py 10000 --rounds 500
+
+The scratch table is dropped afterwards unless --keep is given.
+"""
+import argparse
+import random
+import time
+
+import mysql.connector
+
+from main import DB_CONFIG
+
+TABLE = 'User_info_bench'
+
+# The lookups validate_user used to run: exact match, then a LOWER() scan on miss
+OLD_EXACT_QUERY = f"SELECT user_id FROM {TABLE} WHERE user_name = %s AND password = %s"
+OLD_CASE_QUERY = f"SELECT user_id FROM {TABLE} WHERE LOWER(user_name) = LOWER(%s) AND password = %s"
+# The single round trip validate_user runs now (the password is checked in Python)
+NEW_QUERY = f"SELECT user_id, password FROM {TABLE} WHERE user_name_lower = LOWER(%s) LIMIT 5"
+
+def create_table(cursor, users):
+    """(Re)create the scratch table and fill it with synthetic users"""
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cursor.execute(f"""
+        CREATE TABLE {TABLE} (
+            user_id INT AUTO_INCREMENT PRIMARY KEY,
+            user_name VARCHAR(64) NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            email VARCHAR(255),
+            phone VARCHAR(32),
+            user_name_lower VARCHAR(64) GENERATED ALWAYS AS (LOWER(user_name)) STORED,
+            UNIQUE KEY ux_user_name (user_name),
+            KEY ix_user_name_lower (user_name_lower)
+        )""")
+    insert = f"INSERT INTO {TABLE} (user_name, password, email, phone) VALUES (%s, %s, %s, %s)"
+    batch = []
+    for i in range(users):
+        batch.append((f"User{i}", f"pw{i}", f"user{i}@example.com", f"+1555{i:07d}"))
+        if len(batch) == 10000:
+            cursor.executemany(insert, batch)
+            batch = []
+    if batch:
+        cursor.executemany(insert, batch)
+    cursor.execute(f"ANALYZE TABLE {TABLE}")
+    cursor.fetchall()
+
+def old_lookup(cursor, username, password):
+    """Exact query, then the case-insensitive scan when it misses"""
+    cursor.execute(OLD_EXACT_QUERY, (username, password))
+    if cursor.fetchall():
+        return True
+    cursor.execute(OLD_CASE_QUERY, (username, password))
+    return bool(cursor.fetchall())
+
+def new_lookup(cursor, username, password):
+    """Single indexed query"""
+    cursor.execute(NEW_QUERY, (username,))
+    return any(row[1] == password for row in cursor.fetchall())
+
+def time_lookups(lookup, cursor, credentials):
+    """Average milliseconds per call of lookup over the credentials"""
+    start = time.perf_counter()
+    for username, password in credentials:
+        lookup(cursor, username, password)
+    return (time.perf_counter() - start) * 1000 / len(credentials)
+
+def run(users, rounds, keep):
+    config = {k: v for k, v in DB_CONFIG.items() if v is not None}
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor(buffered=True)
+    try:
+        print(f"Populating {TABLE} with {users} users...")
+        create_table(cursor, users)
+        picks = [random.randrange(users) for _ in range(rounds)]
+        cases = {
+            'hit (exact)': [(f"User{i}", f"pw{i}") for i in picks],
+            'hit (case-insensitive)': [(f"user{i}", f"pw{i}") for i in picks],
+            'miss (wrong password)': [(f"User{i}", "wrong") for i in picks],
+            'miss (unknown user)': [(f"nobody{i}", "wrong") for i in picks],
+        }
+        print(f"{'users':>9}  {'case':<24} {'old ms':>9} {'new ms':>9} {'speedup':>8}")
+        for name, credentials in cases.items():
+            # The old miss path scans the whole table, so cap its rounds on big tables
+            old_credentials = credentials if users <= 100000 else credentials[:20]
+            old_ms = time_lookups(old_lookup, cursor, old_credentials)
+            new_ms = time_lookups(new_lookup, cursor, credentials)
+            print(f"{users:>9}  {name:<24} {old_ms:>9.3f} {new_ms:>9.3f} {old_ms / new_ms:>7.1f}x")
+    finally:
+        if not keep:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.close()
+        connection.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[10000, 1000000])
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch table afterwards')
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.rounds, args.keep)
@@ -0,0 +1,67 @@
+"""Micro-benchmark: text vs server-side prepared execution of the login query shapes.
+
+Uses the scratch table from bench_lookup.py (created here with the given
+number of users) and times every (± email, ± phone) shape built by
+main.login_queries through a plain cursor and a prepared cursor:
+
+    python bench_prepared.py --users 10000 --rounds 2000
+"""
+import argparse
+import random
+import time
+
+import mysql.connector
+
+from bench_lookup import TABLE, create_table
+from main import DB_CONFIG, login_queries
+
+COLUMNS = frozenset(['user_id', 'user_name', 'password', 'email', 'phone', 'user_name_lower'])
+
+def shape_params(i, with_email, with_phone):
+    """Parameters for a successful login of synthetic user i"""
+    params = [f"User{i}"]
+    if with_email:
+        params.append(f"user{i}@example.com")
+    if with_phone:
+        params.append(f"+1555{i:07d}")
+    return params
+
+def time_shape(cursor, query, param_sets):
+    """Average microseconds per execute+fetch"""
+    start = time.perf_counter()
+    for params in param_sets:
+        cursor.execute(query, params)
+        cursor.fetchall()
+    return (time.perf_counter() - start) * 1e6 / len(param_sets)
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    config = {k: v for k, v in DB_CONFIG.items() if v is not None}
+    connection = mysql.connector.connect(**config)
+    setup = connection.cursor(buffered=True)
+    try:
+        create_table(setup, args.users)
+        print(f"{'shape':<22} {'text us':>9} {'prepared us':>12} {'speedup':>8}")
+        for (with_email, with_phone), query in login_queries(COLUMNS).items():
+            query = query.replace('User_info', TABLE)
+            param_sets = [shape_params(random.randrange(args.users), with_email, with_phone)
+                          for _ in range(args.rounds)]
+            text_cursor = connection.cursor()
+            prepared_cursor = connection.cursor(prepared=True)
+            text_us = time_shape(text_cursor, query, param_sets)
+            prepared_us = time_shape(prepared_cursor, query, param_sets)
+            text_cursor.close()
+            prepared_cursor.close()
+            name = 'user+pw' + (' +email' if with_email else '') + (' +phone' if with_phone else '')
+            print(f"{name:<22} {text_us:>9.1f} {prepared_us:>12.1f} {text_us / prepared_us:>7.2f}x")
+    finally:
+        setup.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        setup.close()
+        connection.close()
+
+if __name__ == '__main__':
+    run()
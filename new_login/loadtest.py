@@ -0,0 +1,84 @@
+"""Load test /api/login on the sync (gunicorn) and async (ASGI) apps.
+
+Start both apps against the same local MySQL/MariaDB (e.g. the official
+mariadb Docker image with a User_info table, after `python migrate.py`):
+
+    gunicorn -w 4 -b 127.0.0.1:8001 main:app
+    uvicorn asgi:app --host 127.0.0.1 --port 8002
+
+then compare them at increasing concurrency:
+
+    python loadtest.py http://127.0.0.1:8001 http://127.0.0.1:8002 --concurrency 1 10 100 1000
+
+Every virtual user sends the same login in a loop for --seconds and the
+script reports throughput, latency percentiles and errors per URL. Uses
+only the standard library (one HTTP/1.1 connection per request).
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+async def post_json(host, port, path, payload, timeout):
+    """POST a JSON body and return the HTTP status code"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        body = json.dumps(payload).encode('utf-8')
+        writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                      f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode('ascii') + body)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+async def virtual_user(url, payload, deadline, timeout, latencies, errors):
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') + '/api/login'
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status = await post_json(parts.hostname, parts.port or 80, path, payload, timeout)
+            if status >= 500:
+                errors.append(status)
+            else:
+                latencies.append(time.perf_counter() - start)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError) as e:
+            errors.append(type(e).__name__)
+
+async def run_level(url, payload, concurrency, seconds, timeout):
+    """Run `concurrency` virtual users for `seconds`; return (requests/s, p50 ms, p99 ms, errors)"""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(url, payload, deadline, timeout, latencies, errors)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    if not latencies:
+        return 0.0, float('nan'), float('nan'), len(errors)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    return len(latencies) / elapsed, p50, p99, len(errors)
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('urls', nargs='+', help='base URLs of the apps to compare')
+    parser.add_argument('--concurrency', nargs='*', type=int, default=[1, 10, 100, 1000])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--username', default='loadtest')
+    parser.add_argument('--password', default='loadtest')
+    args = parser.parse_args()
+
+    payload = {'username': args.username, 'password': args.password}
+    print(f"{'url':<28} {'conc':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for url in args.urls:
+        for concurrency in args.concurrency:
+            rps, p50, p99, errors = asyncio.run(run_level(url, payload, concurrency, args.seconds, args.timeout))
+            print(f"{url:<28} {concurrency:>6} {rps:>9.1f} {p50:>9.1f} {p99:>9.1f} {errors:>7}")
+
+if __name__ == '__main__':
+    run()
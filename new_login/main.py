@@ -2,7 +2,15 @@ from flask import Flask, request, render_template_string, jsonify
 import mysql.connector
 import os
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
+import base64
+import hashlib
+import hmac
 import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
 
 app = Flask(__name__)
 
@@ -26,20 +34,155 @@ DB_CONFIG = {
     'sql_mode': 'STRICT_TRANS_TABLES'  # Added for better data integrity
 }
 
+# Connection pool settings - each gunicorn worker process gets its own pool
+POOL_CONFIG = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+    'recycle': float(os.environ.get('DB_POOL_RECYCLE', 1800)),  # reconnect connections older than this
+    'ping_interval': float(os.environ.get('DB_POOL_PING_INTERVAL', 30))  # ping connections idle longer than this
+}
+
+class PooledConnection:
+    """MySQL connection owned by a ConnectionPool; close() hands it back"""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.checked_out = False
+        self.statements = {}  # SQL text -> cursor holding its server-side prepared statement
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        """Return the connection to the pool instead of closing it"""
+        if self.checked_out:
+            self._pool.release(self)
+
+    def prepared_cursor(self, query):
+        """Return a cursor with `query` prepared on the server, kept across checkouts"""
+        cursor = self.statements.get(query)
+        if cursor is None:
+            cursor = self._connection.cursor(prepared=True)
+            self.statements[query] = cursor
+        return cursor
+
+    def drop_statements(self):
+        """Close all prepared statements, e.g. after an error or schema change"""
+        statements, self.statements = self.statements, {}
+        for cursor in statements.values():
+            try:
+                cursor.close()
+            except Error:
+                pass
+
+    def discard(self):
+        """Close the underlying connection for good"""
+        self.statements = {}
+        try:
+            self._connection.close()
+        except Error:
+            pass
+
+class ConnectionPool:
+    """Bounded pool of MySQL connections shared by every route in a worker"""
+
+    def __init__(self, db_config, pool_size=5, max_overflow=10, timeout=10, recycle=1800, ping_interval=30):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self.checked_out = 0
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size + max_overflow)
+
+    def acquire(self):
+        """Check out a connection, waiting up to `timeout` seconds for a free slot"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f"No database connection available after {self.timeout}s "
+                            f"(pool_size={self.pool_size}, max_overflow={self.max_overflow})")
+        try:
+            connection = self._take_idle()
+            if connection is None:
+                connection = PooledConnection(self, mysql.connector.connect(**self.db_config))
+                logger.info("Database connection established successfully")
+        except Exception:
+            self._slots.release()
+            raise
+        connection.checked_out = True
+        with self._lock:
+            self.checked_out += 1
+        return connection
+
+    def _take_idle(self):
+        """Pop the most recently used idle connection that is still usable"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+            now = time.monotonic()
+            if now - connection.created_at > self.recycle:
+                connection.discard()
+                continue
+            if now - connection.last_used > self.ping_interval:
+                try:
+                    connection.ping(reconnect=False)
+                except Error as e:
+                    logger.warning(f"Discarding stale pooled connection: {e}")
+                    connection.discard()
+                    continue
+            return connection
+
+    def release(self, connection):
+        """Put a connection back; overflow connections beyond pool_size are closed"""
+        connection.checked_out = False
+        connection.last_used = time.monotonic()
+        with self._lock:
+            self.checked_out -= 1
+            keep = len(self._idle) < self.pool_size
+            if keep:
+                self._idle.append(connection)
+        if not keep:
+            connection.discard()
+        self._slots.release()
+
+    def status(self):
+        """Pool counters for the health endpoint"""
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'idle': len(self._idle),
+                'checked_out': self.checked_out
+            }
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return this worker's connection pool, creating it on first use (and after fork)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                # Remove None values from config to avoid connection issues
+                config = {k: v for k, v in DB_CONFIG.items() if v is not None}
+                _pool = ConnectionPool(config, **POOL_CONFIG)
+                _pool_pid = os.getpid()
+    return _pool
+
 def get_db_connection():
-    """Create and return a database connection with improved error handling"""
+    """Check out a pooled database connection; close() returns it to the pool"""
     try:
-        # Remove None values from config to avoid connection issues
-        config = {k: v for k, v in DB_CONFIG.items() if v is not None}
-        connection = mysql.connector.connect(**config)
-        
-        if connection.is_connected():
-            logger.info("Database connection established successfully")
-            return connection
-        else:
-            logger.error("Database connection failed")
-            return None
-            
+        return get_pool().acquire()
     except Error as e:
         logger.error(f"Error connecting to MySQL: {e}")
         return None
@@ -47,17 +190,293 @@ def get_db_connection():
         logger.error(f"Unexpected error during database connection: {e}")
         return None
 
+# Short-lived cache of /api/login results (LOGIN_CACHE_TTL=0 disables it)
+LOGIN_CACHE_CONFIG = {
+    'ttl': float(os.environ.get('LOGIN_CACHE_TTL', 0)),  # seconds a result is reused
+    'max_entries': int(os.environ.get('LOGIN_CACHE_SIZE', 1024))
+}
+
+class CredentialCache:
+    """Bounded LRU+TTL cache of login results keyed on a salted hash of the credentials"""
+
+    def __init__(self, ttl=0, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._salt = os.urandom(16)  # per process, so keys are useless outside this worker
+        self._entries = OrderedDict()  # key -> (expires_at, result, user)
+        self._keys_by_user = {}  # lowercased username -> keys, for invalidation
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _key(self, *fields):
+        digest = hashlib.blake2b(key=self._salt, digest_size=16)
+        for field in fields:
+            data = (field or '').encode('utf-8')
+            digest.update(len(data).to_bytes(4, 'big') + data)
+        return digest.digest()
+
+    def get(self, username, password, email=None, phone=None):
+        """Return the cached result for these credentials, or None on a miss"""
+        if not self.enabled:
+            return None
+        key = self._key(username, password, email, phone)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, username, password, email, phone, result):
+        """Remember a login result for `ttl` seconds"""
+        if not self.enabled:
+            return
+        key = self._key(username, password, email, phone)
+        user = username.lower()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result, user)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, user = self._entries.pop(key)
+        keys = self._keys_by_user.get(user)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user]
+
+    def invalidate_user(self, username):
+        """Drop every cached result for a user - call this when their password changes"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(username.lower(), ())):
+                self._remove(key)
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        """Cache counters for the health endpoint"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+credential_cache = CredentialCache(**LOGIN_CACHE_CONFIG)
+
+def invalidate_credentials(username):
+    """Invalidation hook for password changes: forget cached logins for username"""
+    credential_cache.invalidate_user(username)
+
+class SchemaCache:
+    """Cached DESCRIBE of a table, reloaded after `ttl` seconds or when invalidated"""
+
+    def __init__(self, table, ttl=300):
+        self.table = table
+        self.ttl = ttl
+        self._columns = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def columns(self, connection=None):
+        """Return the cached column descriptions, reloading them if stale"""
+        if self._columns is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh(connection)
+        return self._columns
+
+    def column_names(self, connection=None):
+        """Return the set of column names"""
+        return frozenset(col['Field'] for col in self.columns(connection))
+
+    def refresh(self, connection=None):
+        """Reload the table description (uses a pooled connection if none is given)"""
+        with self._lock:
+            if self._columns is not None and time.monotonic() - self._loaded_at <= self.ttl:
+                return  # another thread refreshed it while we waited
+            own_connection = connection is None
+            if own_connection:
+                connection = get_db_connection()
+                if not connection:
+                    raise PoolError("No database connection available to load table schema")
+            cursor = None
+            try:
+                cursor = connection.cursor(buffered=True)
+                cursor.execute(f"DESCRIBE {self.table}")
+                self._columns = [{'Field': safe_convert_to_json(col[0]),
+                                  'Type': safe_convert_to_json(col[1]),
+                                  'Null': safe_convert_to_json(col[2]),
+                                  'Key': safe_convert_to_json(col[3])} for col in cursor.fetchall()]
+                self._loaded_at = time.monotonic()
+                logger.info(f"Loaded {self.table} schema: {sorted(col['Field'] for col in self._columns)}")
+            finally:
+                if cursor:
+                    cursor.close()
+                if own_connection:
+                    connection.close()
+
+    def invalidate(self):
+        """Force a reload on next use, e.g. after a query failed"""
+        self._columns = None
+
+schema_cache = SchemaCache('User_info', ttl=float(os.environ.get('DB_SCHEMA_CACHE_TTL', 300)))
+
+# Password hashing - scrypt cost parameters for stored hashes (n must be a power of two)
+PASSWORD_HASH_CONFIG = {
+    'n': int(os.environ.get('PASSWORD_SCRYPT_N', 16384)),  # CPU/memory cost
+    'r': int(os.environ.get('PASSWORD_SCRYPT_R', 8)),  # block size
+    'p': int(os.environ.get('PASSWORD_SCRYPT_P', 1))  # parallelism
+}
+
+# Hashing runs in the request thread, at most max_pending at once per worker
+# (hashlib.scrypt releases the GIL, so threaded workers hash concurrently).
+# Only asgi.py hands hashing to a bounded thread pool, sized by 'workers':
+# there it keeps the event loop free, while a sync worker would just block.
+HASH_POOL_CONFIG = {
+    'workers': int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)),  # executor threads, ASGI app only
+    'max_pending': int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64)),  # queued + running jobs
+    'timeout': float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # seconds to wait for a free slot
+}
+
+def _scrypt(password, salt, n, r, p, dklen=32):
+    # OpenSSL's default 32 MiB memory cap is too small for n >= 2**15
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2) + (1 << 20), dklen=dklen)
+
+def hash_password(password, n=None, r=None, p=None):
+    """Hash a password as scrypt$n$r$p$salt$key using the configured cost"""
+    n = n or PASSWORD_HASH_CONFIG['n']
+    r = r or PASSWORD_HASH_CONFIG['r']
+    p = p or PASSWORD_HASH_CONFIG['p']
+    salt = os.urandom(16)
+    key = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${base64.b64encode(salt).decode()}${base64.b64encode(key).decode()}"
+
+def verify_password(password, stored):
+    """Check a password against a stored value, returning (matches, needs_rehash)
+
+    Rows that still hold a plaintext password are compared in constant time
+    and always need a rehash, so they migrate lazily on the next login.
+    """
+    if stored is None:
+        return False, False
+    if isinstance(stored, bytes):
+        stored = stored.decode('utf-8')
+    if not stored.startswith('scrypt$'):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8')), True
+    try:
+        _, n, r, p, salt, expected = stored.split('$')
+        n, r, p = int(n), int(r), int(p)
+        salt = base64.b64decode(salt)
+        expected = base64.b64decode(expected)
+        # scrypt rejects malformed parameters (n not a power of two, bad r/p)
+        matches = hmac.compare_digest(_scrypt(password, salt, n, r, p, len(expected)), expected)
+    except (ValueError, TypeError, OverflowError):
+        return False, False
+    current = (PASSWORD_HASH_CONFIG['n'], PASSWORD_HASH_CONFIG['r'], PASSWORD_HASH_CONFIG['p'])
+    return matches, matches and (n, r, p) != current
+
+_hash_slots = None
+_hash_slots_pid = None
+_hash_lock = threading.Lock()
+_dummy_hash = None
+
+def run_hashing(fn, *args):
+    """Run a hashing call in the request thread, bounded by this worker's hashing slots
+
+    Handing the call to a thread pool would gain nothing here: a sync
+    worker would block on the result all the same.
+    """
+    global _hash_slots, _hash_slots_pid
+    if _hash_slots is None or _hash_slots_pid != os.getpid():
+        with _hash_lock:
+            if _hash_slots is None or _hash_slots_pid != os.getpid():
+                _hash_slots = threading.BoundedSemaphore(HASH_POOL_CONFIG['max_pending'])
+                _hash_slots_pid = os.getpid()
+    slots = _hash_slots
+    if not slots.acquire(timeout=HASH_POOL_CONFIG['timeout']):
+        raise RuntimeError("Password hashing is saturated")
+    try:
+        return fn(*args)
+    finally:
+        slots.release()
+
+def find_password_match(password, stored_values):
+    """Verify a password against candidate stored values (see run_hashing)
+
+    Returns (index of the first match or None, needs_rehash). With no
+    candidates a dummy hash is still checked, so unknown usernames take as
+    long as wrong passwords.
+    """
+    global _dummy_hash
+    if not stored_values:
+        if _dummy_hash is None:
+            _dummy_hash = run_hashing(hash_password, base64.b64encode(os.urandom(16)).decode())
+        run_hashing(verify_password, password, _dummy_hash)
+        return None, False
+    for index, stored in enumerate(stored_values):
+        matches, needs_rehash = run_hashing(verify_password, password, stored)
+        if matches:
+            return index, needs_rehash
+    return None, False
+
+def build_login_query(columns, with_email=False, with_phone=False):
+    """Build the login lookup for the given table columns and optional checks"""
+    # Every exact match is also a match on user_name_lower, so one indexed
+    # lookup resolves both exact and case-insensitive usernames. Databases
+    # not migrated yet (see migrate.py) fall back to a LOWER() table scan.
+    # The password is verified in Python against the stored hash.
+    if 'user_name_lower' in columns:
+        query = "SELECT user_id, user_name, password FROM User_info WHERE user_name_lower = LOWER(%s)"
+    else:
+        query = "SELECT user_id, user_name, password FROM User_info WHERE LOWER(user_name) = LOWER(%s)"
+    if with_email:
+        query += " AND LOWER(email) = LOWER(%s)"
+    if with_phone:
+        query += " AND phone = %s"
+    return query + " LIMIT 5"
+
+# Compare-and-set, so a concurrent password change is never overwritten
+REHASH_QUERY = "UPDATE User_info SET password = %s WHERE user_id = %s AND password = %s"
+
+@lru_cache(maxsize=4)
+def login_queries(columns):
+    """All four login query shapes (± email, ± phone) for a given column set, built once"""
+    return {(with_email, with_phone): build_login_query(columns, with_email, with_phone)
+            for with_email in (False, True) for with_phone in (False, True)}
+
 def validate_user(username, password, email=None, phone=None):
-    """Validate user credentials against existing database with additional info"""
+    """Validate user credentials against existing database with additional info
+
+    Returns None instead of False when the database itself failed.
+    """
     connection = get_db_connection()
     if not connection:
         logger.error("No database connection available")
-        return False
+        return None
     
-    cursor = None
     try:
-        cursor = connection.cursor(buffered=True)  # Use buffered cursor
-        
         # Log validation attempt (without password for security)
         logger.info(f"Attempting to validate user: '{username}'")
         if email:
@@ -65,70 +484,66 @@ def validate_user(username, password, email=None, phone=None):
         if phone:
             logger.info(f"Phone provided: '{phone}'")
         
-        # Debug: Check table structure first
-        try:
-            cursor.execute("DESCRIBE User_info")
-            columns = cursor.fetchall()
-            logger.info(f"Table structure: {columns}")
-        except Error as e:
-            logger.error(f"Error checking table structure: {e}")
-        
-        # Build dynamic query based on provided information
-        base_query = "SELECT user_id, user_name, password, email, phone FROM User_info WHERE user_name = %s AND password = %s"
-        params = [username, password]
-        
-        # Add email check if provided and not empty
-        if email and email.strip():
-            base_query += " AND email = %s"
-            params.append(email.strip())
+        columns = schema_cache.column_names(connection)
+        email = email.strip() if email else ''
+        phone = phone.strip() if phone else ''
+        if 'user_name_lower' not in columns:
+            logger.warning("Column user_name_lower is missing - run migrate.py to index logins")
+        if (email and 'email' not in columns) or (phone and 'phone' not in columns):
+            logger.warning("User_info has no email/phone column to verify against")
+            return False
         
-        # Add phone check if provided and not empty
-        if phone and phone.strip():
-            base_query += " AND phone = %s"
-            params.append(phone.strip())
+        # Pick the pre-built query shape for the provided information
+        query = login_queries(columns)[(bool(email), bool(phone))]
+        params = [username]
+        if email:
+            params.append(email)
+        if phone:
+            params.append(phone)
         
         logger.info(f"Executing query with {len(params)} parameters")
+        # Server-side prepared statement, cached on the pooled connection
+        cursor = connection.prepared_cursor(query)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
         
-        cursor.execute(base_query, params)
-        result = cursor.fetchone()
+        # Try the exact-case username first
+        rows.sort(key=lambda row: row[1] != username)
+        match, needs_rehash = find_password_match(password, [row[2] for row in rows])
         
-        if result:
+        if match is None:
+            logger.info("No matching user found")
+            return False
+        user_id, user_name, stored = rows[match]
+        if user_name == username:
             logger.info("User validation successful!")
-            return True
         else:
-            # Try case-insensitive search for username and email
-            logger.info("Trying case-insensitive search")
-            case_query = "SELECT user_id, user_name, password, email, phone FROM User_info WHERE LOWER(user_name) = LOWER(%s) AND password = %s"
-            case_params = [username, password]
-            
-            if email and email.strip():
-                case_query += " AND LOWER(email) = LOWER(%s)"
-                case_params.append(email.strip())
-            
-            if phone and phone.strip():
-                case_query += " AND phone = %s"
-                case_params.append(phone.strip())
-            
-            cursor.execute(case_query, case_params)
-            result_case = cursor.fetchone()
-            
-            if result_case:
-                logger.info("User validation successful (case-insensitive)!")
-                return True
-            else:
-                logger.info("No matching user found")
-                return False
+            logger.info("User validation successful (case-insensitive)!")
+        
+        if needs_rehash:
+            # Lazy migration: store the password under the current scrypt cost
+            update = None
+            try:
+                update = connection.cursor()
+                update.execute(REHASH_QUERY, (run_hashing(hash_password, password), user_id, stored))
+                logger.info(f"Rehashed password for user: '{user_name}'")
+            except Error as e:
+                logger.warning(f"Could not rehash password: {e}")
+            finally:
+                if update:
+                    update.close()
+        return True
                 
     except Error as e:
         logger.error(f"Database error validating user: {e}")
-        return False
+        schema_cache.invalidate()
+        connection.drop_statements()
+        return None
     except Exception as e:
         logger.error(f"Unexpected error validating user: {e}")
-        return False
+        return None
     finally:
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
+        if connection:
             connection.close()
 
 # HTML template for login form
@@ -314,7 +729,7 @@ def login():
                                         message_type="error",
                                         request=request)
         
-        # Check database connection first
+        # Check database connection first (a pool checkout, so validate_user reuses this connection)
         connection = get_db_connection()
         if not connection:
             logger.error("Database connection failed during login attempt")
@@ -380,7 +795,13 @@ def api_login():
         if not username or not password:
             return jsonify({'success': False, 'message': 'Username and password cannot be empty'}), 400
         
-        if validate_user(username, password, email, phone):
+        valid = credential_cache.get(username, password, email, phone)
+        if valid is None:
+            valid = validate_user(username, password, email, phone)
+            if valid is not None:  # never cache database failures
+                credential_cache.put(username, password, email, phone, valid)
+        
+        if valid:
             verification_info = []
             if email:
                 verification_info.append('email')
@@ -433,9 +854,8 @@ def debug_info():
         cursor.execute("SHOW TABLES")
         tables = cursor.fetchall()
         
-        # Get table structure
-        cursor.execute("DESCRIBE User_info")
-        columns = cursor.fetchall()
+        # Get table structure (cached)
+        columns = schema_cache.columns(connection)
         
         # Get sample data (first 5 rows, hiding passwords)
         cursor.execute("SELECT user_id, user_name, 'HIDDEN' as password, email, phone FROM User_info LIMIT 5")
@@ -447,10 +867,6 @@ def debug_info():
         
         # Safely convert all data to JSON-serializable format
         safe_tables = [safe_convert_to_json(table[0]) for table in tables]
-        safe_columns = [{'Field': safe_convert_to_json(col[0]), 
-                        'Type': safe_convert_to_json(col[1]), 
-                        'Null': safe_convert_to_json(col[2]), 
-                        'Key': safe_convert_to_json(col[3])} for col in columns]
         safe_users = [{'user_id': safe_convert_to_json(row[0]), 
                       'user_name': safe_convert_to_json(row[1]), 
                       'password': safe_convert_to_json(row[2]), 
@@ -460,7 +876,7 @@ def debug_info():
         return jsonify({
             'database_connected': True,
             'tables': safe_tables,
-            'user_info_columns': safe_columns,
+            'user_info_columns': columns,
             'sample_users': safe_users,
             'total_users': safe_convert_to_json(user_count),
             'db_config': {
@@ -473,6 +889,7 @@ def debug_info():
         
     except Error as e:
         logger.error(f"Debug endpoint database error: {e}")
+        schema_cache.invalidate()
         return jsonify({'error': f'Database error: {str(e)}'}), 500
     except Exception as e:
         logger.error(f"Debug endpoint unexpected error: {e}")
@@ -480,7 +897,7 @@ def debug_info():
     finally:
         if cursor:
             cursor.close()
-        if connection and connection.is_connected():
+        if connection:
             connection.close()
 
 @app.route('/health')
@@ -498,6 +915,8 @@ def health_check():
                 'status': 'healthy', 
                 'database': 'connected',
                 'users_count': safe_convert_to_json(count),
+                'pool': get_pool().status(),
+                'login_cache': credential_cache.stats(),
                 'timestamp': safe_convert_to_json(request.environ.get('REQUEST_TIME', 'unknown'))
             })
         except Error as e:
@@ -517,13 +936,15 @@ def health_check():
         finally:
             if cursor:
                 cursor.close()
-            if connection and connection.is_connected():
+            if connection:
                 connection.close()
     else:
         return jsonify({
             'status': 'unhealthy', 
             'database': 'disconnected',
-            'message': 'Could not establish database connection'
+            'message': 'Could not establish database connection',
+            'pool': get_pool().status(),
+            'login_cache': credential_cache.stats()
         }), 500
 
 @app.errorhandler(404)
@@ -554,6 +975,10 @@ if __name__ == '__main__':
     if connection:
         logger.info("Database connection successful!")
         connection.close()
+        try:
+            schema_cache.refresh()
+        except Error as e:
+            logger.warning(f"Could not load User_info schema: {e}")
     else:
         logger.warning("Warning: Could not connect to database")
         logger.warning("Please check your environment variables:")
@@ -0,0 +1,111 @@
+"""One-off schema migration for User_info.
+
+Adds the indexes the login lookups rely on:
+  * a unique index on user_name (exact-match point lookups)
+  * a generated user_name_lower column plus index (case-insensitive lookups)
+  * a password column wide enough for scrypt hashes (plaintext passwords are
+    rehashed lazily by validate_user on the next successful login)
+
+Every step checks information_schema first, so it is safe to run repeatedly:
+    python migrate.py
+"""
+import logging
+
+import mysql.connector
+from mysql.connector import Error
+
+from main import DB_CONFIG
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'User_info'
+
+def column_exists(cursor, column):
+    """Check whether User_info already has the given column"""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (TABLE, column))
+    return cursor.fetchone()[0] > 0
+
+def index_exists(cursor, column, unique=False):
+    """Check whether an index (optionally unique) leads with the given column"""
+    query = ("SELECT COUNT(*) FROM information_schema.statistics "
+             "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s AND seq_in_index = 1")
+    if unique:
+        query += " AND non_unique = 0"
+    cursor.execute(query, (TABLE, column))
+    return cursor.fetchone()[0] > 0
+
+def add_unique_user_name_index(cursor):
+    """Create the unique index on user_name unless duplicates prevent it"""
+    if index_exists(cursor, 'user_name', unique=True):
+        logger.info("Unique index on user_name already exists")
+        return
+    cursor.execute(f"SELECT user_name, COUNT(*) FROM {TABLE} GROUP BY user_name HAVING COUNT(*) > 1 LIMIT 10")
+    duplicates = cursor.fetchall()
+    if duplicates:
+        logger.warning(f"Cannot create unique index on user_name, duplicate names found: {duplicates}")
+        return
+    cursor.execute(f"CREATE UNIQUE INDEX ux_user_info_user_name ON {TABLE} (user_name)")
+    logger.info("Created unique index ux_user_info_user_name")
+
+def add_user_name_lower_column(cursor):
+    """Add the generated lowercase user_name column and index it"""
+    if column_exists(cursor, 'user_name_lower'):
+        logger.info("Column user_name_lower already exists")
+    else:
+        cursor.execute(
+            "SELECT column_type FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = 'user_name'",
+            (TABLE,))
+        column_type = cursor.fetchone()[0]
+        if isinstance(column_type, bytes):
+            column_type = column_type.decode('utf-8')
+        cursor.execute(f"ALTER TABLE {TABLE} ADD COLUMN user_name_lower {column_type} "
+                       f"GENERATED ALWAYS AS (LOWER(user_name)) STORED")
+        logger.info(f"Added generated column user_name_lower {column_type}")
+
+    if index_exists(cursor, 'user_name_lower'):
+        logger.info("Index on user_name_lower already exists")
+    else:
+        cursor.execute(f"CREATE INDEX ix_user_info_user_name_lower ON {TABLE} (user_name_lower)")
+        logger.info("Created index ix_user_info_user_name_lower")
+
+def widen_password_column(cursor):
+    """Make room for scrypt hashes (about 90 characters) in the password column"""
+    cursor.execute(
+        "SELECT data_type, character_maximum_length, is_nullable FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = 'password'",
+        (TABLE,))
+    data_type, length, nullable = cursor.fetchone()
+    if isinstance(data_type, bytes):
+        data_type = data_type.decode('utf-8')
+    if length is None or length >= 255 or data_type.lower().endswith('text'):
+        logger.info(f"Column password is already wide enough ({data_type}({length}))")
+        return
+    null_clause = 'NULL' if nullable == 'YES' else 'NOT NULL'
+    cursor.execute(f"ALTER TABLE {TABLE} MODIFY password VARCHAR(255) {null_clause}")
+    logger.info("Widened column password to VARCHAR(255)")
+
+def migrate():
+    """Apply every migration step in order"""
+    # Remove None values from config to avoid connection issues
+    config = {k: v for k, v in DB_CONFIG.items() if v is not None}
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor(buffered=True)
+    try:
+        add_unique_user_name_index(cursor)
+        add_user_name_lower_column(cursor)
+        widen_password_column(cursor)
+    finally:
+        cursor.close()
+        connection.close()
+
+if __name__ == '__main__':
+    try:
+        migrate()
+        logger.info("Migration complete")
+    except Error as e:
+        logger.error(f"Migration failed: {e}")
+        raise SystemExit(1)
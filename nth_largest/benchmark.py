@@ -0,0 +1,78 @@
+"""Benchmark nth-largest strategies against the old full sort.
+
+    python benchmark.py                       # 1e3 .. 1e7 elements
+    python benchmark.py --sizes 1000 100000 --repeat 5
+    python benchmark.py --workers 1 2 4 8     # also time parallel selection
+
+Times (in ms, best of --repeat) for each input size m and rank n:
+  sort      sorted(values, reverse=True)[n - 1]   (what index() used to do)
+  heap      heapq.nlargest(n, values)[-1]         (only for n <= 1000)
+  select    pure-Python introselect
+  numpy     np.partition on a ready int64 array   (skipped without NumPy)
+  auto      selection.nth_largest on a Python list
+
+With --workers, a second table times the median of each input of at least
+1e6 elements with parallel.parallel_select for each worker count (1 means
+a plain np.partition), including the copy into shared memory.
+"""
+import argparse
+import heapq
+import random
+import time
+
+import parallel
+import selection
+
+def best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='*', type=int, default=[10 ** e for e in range(3, 8)])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', nargs='*', type=int, default=[])
+    args = parser.parse_args()
+
+    np = selection.np
+    print(f"{'m':>9} {'n':>9} {'sort':>9} {'heap':>9} {'select':>9} {'numpy':>9} {'auto':>9}")
+    for m in args.sizes:
+        values = [random.randint(-10 ** 9, 10 ** 9) for _ in range(m)]
+        packed = np.array(values, dtype=np.int64) if np is not None else None
+        for n in sorted({1, min(100, m), m // 2}):
+            timings = {
+                'sort': best_time(lambda: sorted(values, reverse=True)[n - 1], args.repeat),
+                'heap': best_time(lambda: heapq.nlargest(n, values)[-1], args.repeat) if n <= 1000 else None,
+                'select': best_time(lambda: selection.select(values, m - n), args.repeat),
+                'numpy': best_time(lambda: np.partition(packed, m - n)[m - n], args.repeat) if np is not None else None,
+                'auto': best_time(lambda: selection.nth_largest(values, n), args.repeat),
+            }
+            cells = ' '.join(f"{t:>9.2f}" if t is not None else f"{'-':>9}" for t in timings.values())
+            print(f"{m:>9} {n:>9} {cells}")
+
+    if np is None or not args.workers:
+        return
+    print()
+    print(f"{'m':>9} " + ' '.join(f"{f'{w} proc':>9}" for w in args.workers))
+    for w in args.workers:
+        if w > 1:
+            parallel.parallel_select(np.arange(2 * w, dtype=np.int64), [0], workers=w)  # start the pool
+    for m in args.sizes:
+        if m < 10 ** 6:
+            continue
+        packed = np.random.randint(-10 ** 9, 10 ** 9, size=m, dtype=np.int64)
+        k = m // 2
+        cells = []
+        for w in args.workers:
+            if w > 1:
+                cells.append(best_time(lambda: parallel.parallel_select(packed, [k], workers=w), args.repeat))
+            else:
+                cells.append(best_time(lambda: np.partition(packed, k)[k], args.repeat))
+        print(f"{m:>9} " + ' '.join(f"{t:>9.2f}" for t in cells))
+
+if __name__ == '__main__':
+    run()
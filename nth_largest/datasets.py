@@ -0,0 +1,186 @@
+"""Uploaded datasets kept sorted on local disk for repeated order-statistic queries.
+
+Each dataset is stored once, keyed by a hash of its int64 contents, as a
+file of native-endian int64 values sorted in ascending order (the files
+never leave the machine). Queries memory-map the file, so every gunicorn
+worker shares the same page cache:
+
+* nth largest is a single index lookup, O(1)
+* rank and range counts are binary searches, O(log m)
+
+Least recently used files are deleted once the directory grows past
+DATASET_CONFIG['max_bytes'].
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from selection import np, to_int64_array
+
+DATASET_CONFIG = {
+    'directory': os.environ.get('DATASET_DIR', os.path.join(tempfile.gettempdir(), 'nth_largest_datasets')),
+    'max_bytes': int(os.environ.get('DATASET_MAX_BYTES', 1024 * 1024 * 1024)),
+    'open_files': int(os.environ.get('DATASET_OPEN_FILES', 16)),
+    'touch_interval': 60,  # seconds between mtime bumps used for LRU eviction
+}
+
+SUFFIX = '.i64'
+
+class Dataset:
+    """A memory-mapped sorted dataset"""
+
+    def __init__(self, dataset_id, path):
+        self.id = dataset_id
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # mmap cannot map an empty file
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.values = memoryview(self._mmap).cast('q') if self._mmap is not None else memoryview(array('q'))
+        self.touched = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def nth_largest(self, n):
+        """The n-th largest value (1-based)"""
+        if not 1 <= n <= len(self.values):
+            raise ValueError(f"n must be between 1 and {len(self.values)}")
+        return self.values[len(self.values) - n]
+
+    def rank(self, value):
+        """(values greater than value, values equal to value)"""
+        below = bisect_left(self.values, value)
+        not_above = bisect_right(self.values, value)
+        return len(self.values) - not_above, not_above - below
+
+    def count_between(self, lo, hi):
+        """Number of values in [lo, hi]"""
+        if lo > hi:
+            return 0
+        return bisect_right(self.values, hi) - bisect_left(self.values, lo)
+
+class DatasetStore:
+    """Content-addressed sorted datasets on disk, with an LRU of open mappings"""
+
+    def __init__(self, directory, max_bytes, open_files, touch_interval):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.open_files = open_files
+        self.touch_interval = touch_interval
+        self.lock = threading.Lock()
+        self.open = OrderedDict()  # id -> Dataset
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, dataset_id):
+        return os.path.join(self.directory, dataset_id + SUFFIX)
+
+    def add(self, values):
+        """Store values (an iterable of int64s) and return (id, count, created)
+
+        Raises ValueError if the dataset alone would exceed max_bytes.
+        """
+        packed = values if isinstance(values, array) and values.typecode == 'q' else array('q', values)
+        size = len(packed) * packed.itemsize
+        if size > self.max_bytes:
+            raise ValueError(f"The dataset takes {size} bytes, more than the store's {self.max_bytes}")
+        dataset_id = hashlib.blake2b(memoryview(packed).cast('B'), digest_size=16).hexdigest()
+        path = self._path(dataset_id)
+        if os.path.exists(path):
+            os.utime(path)
+            return dataset_id, len(packed), False
+
+        arr = to_int64_array(packed)
+        ordered = np.sort(arr) if arr is not None else array('q', sorted(packed))
+        # Write under a temporary name so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(memoryview(ordered).cast('B'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict(keep=path)
+        return dataset_id, len(packed), True
+
+    def get(self, dataset_id):
+        """Return the Dataset for an id, or None if it is unknown or was evicted"""
+        if len(dataset_id) != 32 or not all(c in '0123456789abcdef' for c in dataset_id):
+            return None
+        with self.lock:
+            dataset = self.open.get(dataset_id)
+            if dataset is not None:
+                self.open.move_to_end(dataset_id)
+        if dataset is None:
+            try:
+                dataset = Dataset(dataset_id, self._path(dataset_id))
+            except FileNotFoundError:
+                return None
+            with self.lock:
+                self.open[dataset_id] = dataset
+                # Unmapping is left to garbage collection in case a request still uses it
+                while len(self.open) > self.open_files:
+                    self.open.popitem(last=False)
+        now = time.time()
+        if now - dataset.touched > self.touch_interval:
+            dataset.touched = now
+            try:
+                os.utime(dataset.path)
+            except FileNotFoundError:
+                pass  # evicted by another worker; the mapping stays valid
+        return dataset
+
+    def evict(self, keep=None):
+        """Delete least recently used files until the directory fits in max_bytes
+
+        The file at `keep` (one just written) is never deleted.
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(SUFFIX)]
+        return {
+            'datasets': len(files),
+            'bytes': sum(entry.stat().st_size for entry in files),
+            'max_bytes': self.max_bytes,
+            'open': len(self.open),
+        }
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return this worker's DatasetStore, creating it after fork"""
+    global _store, _store_pid
+    if _store is None or _store_pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store_pid != os.getpid():
+                _store = DatasetStore(**DATASET_CONFIG)
+                _store_pid = os.getpid()
+    return _store
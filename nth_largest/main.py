@@ -1,7 +1,33 @@
-from flask import Flask, request, render_template_string
+import hashlib
+import math
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from fractions import Fraction
+
+from flask import Flask, request, render_template_string, jsonify, abort
+
+from datasets import get_store
+from parsing import StreamingForm, iter_chunks, iter_int64_batches, iter_token_batches, read_numbers, top_k
+from selection import nth_largest_many, sort_descending
+from sketch import DEFAULT_ERROR, KLLSketch
+from streams import streams
 
 app = Flask(__name__)
 
+# The result page shows this many ranks on each side of n; the rest is paged in
+CONTEXT_RADIUS = 25
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+# Submitted lists kept per worker for /api/nth/page
+RECENT_DATASETS = 8
+RECENT_DATASETS_MAX_BYTES = 256 * 1024 * 1024
+# The numbers are echoed back into the form only up to this many bytes
+ECHO_LIMIT = 16 * 1024
+# Plain-text /api/nth bodies asking only for ranks up to this keep just a top-k heap
+TOP_K_STREAM_LIMIT = 10000
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
@@ -292,6 +318,27 @@ HTML_TEMPLATE = """
             50% { transform: scale(1.15); }
         }
 
+        .window-info {
+            margin-top: 12px;
+            font-size: 0.85em;
+            color: #71717a;
+        }
+
+        .page-btn {
+            margin-top: 16px;
+            background: rgba(120, 119, 198, 0.15);
+            color: #e4e4e7;
+            border: 1px solid rgba(120, 119, 198, 0.3);
+            padding: 8px 20px;
+            border-radius: 12px;
+            cursor: pointer;
+            font-weight: 600;
+        }
+
+        .page-btn:hover {
+            background: rgba(120, 119, 198, 0.3);
+        }
+
         .placeholder-text {
             color: #71717a;
             font-style: italic;
@@ -352,7 +399,7 @@ HTML_TEMPLATE = """
                            id="numbers" 
                            name="numbers" 
                            placeholder="e.g., 45, 23, 78, 12, 89, 34, 67" 
-                           value="{{ request.form.numbers if request.form.numbers else '' }}"
+                           value="{{ numbers_value if numbers_value else '' }}"
                            required>
                 </div>
                 
@@ -363,7 +410,7 @@ HTML_TEMPLATE = """
                            name="n" 
                            min="1" 
                            placeholder="e.g., 3"
-                           value="{{ request.form.n if request.form.n else '' }}"
+                           value="{{ n if n is not none else '' }}"
                            required>
                 </div>
             </div>
@@ -384,14 +431,24 @@ HTML_TEMPLATE = """
                     <p>The <strong>{{ n }}{{ 'st' if n == 1 else 'nd' if n == 2 else 'rd' if n == 3 else 'th' }}</strong> largest number is:</p>
                     <div class="result-value">{{ result }}</div>
                     
-                    {% if sorted_numbers %}
+                    {% if window %}
                         <div class="numbers-display">
                             <p><strong>Numbers sorted in descending order:</strong></p>
-                            <div class="sorted-numbers">
-                                {% for num in sorted_numbers %}
-                                    <span class="number-item {{ 'highlight' if loop.index == n else '' }}">{{ num }}</span>
+                            {% if dataset_id and window[0][0] > 1 %}
+                                <button type="button" class="page-btn" id="load-larger">▲ Show larger</button>
+                            {% endif %}
+                            <div class="sorted-numbers" id="sorted-numbers"
+                                 data-dataset="{{ dataset_id or '' }}"
+                                 data-first="{{ window[0][0] }}"
+                                 data-last="{{ window[-1][0] }}">
+                                {% for rank, num in window %}
+                                    <span class="number-item {{ 'highlight' if rank == n else '' }}" title="#{{ rank }}">{{ num }}</span>
                                 {% endfor %}
                             </div>
+                            {% if dataset_id and window[-1][0] < count %}
+                                <button type="button" class="page-btn" id="load-smaller">▼ Show smaller</button>
+                            {% endif %}
+                            <p class="window-info">Ranks <span id="window-first">{{ window[0][0] }}</span>–<span id="window-last">{{ window[-1][0] }}</span> of {{ count }}</p>
                         </div>
                     {% endif %}
                 {% endif %}
@@ -415,35 +472,157 @@ HTML_TEMPLATE = """
 
             // Auto-focus on first input
             document.getElementById('numbers').focus();
+
+            // Page more of the sorted list in around the result
+            const list = document.getElementById('sorted-numbers');
+            if (!list || !list.dataset.dataset) {
+                return;
+            }
+            function loadPage(button, before) {
+                const first = Number(list.dataset.first);
+                const last = Number(list.dataset.last);
+                const offset = before ? Math.max(0, first - 1 - {{ page_size }}) : last;
+                const limit = before ? first - 1 - offset : {{ page_size }};
+                button.disabled = true;
+                fetch(`/api/nth/page?id=${list.dataset.dataset}&offset=${offset}&limit=${limit}`)
+                    .then(response => response.json().then(data => ({ok: response.ok, data})))
+                    .then(({ok, data}) => {
+                        if (!ok) {
+                            button.textContent = data.error || 'Unavailable';
+                            return;
+                        }
+                        const items = data.values.map((value, i) => {
+                            const item = document.createElement('span');
+                            item.className = 'number-item';
+                            item.title = '#' + (offset + i + 1);
+                            item.textContent = value;
+                            return item;
+                        });
+                        if (before) {
+                            list.prepend(...items);
+                            list.dataset.first = offset + 1;
+                            document.getElementById('window-first').textContent = offset + 1;
+                        } else {
+                            list.append(...items);
+                            list.dataset.last = offset + items.length;
+                            document.getElementById('window-last').textContent = offset + items.length;
+                        }
+                        const done = before ? offset === 0 : offset + items.length >= data.count;
+                        button.disabled = false;
+                        button.style.display = done ? 'none' : '';
+                    })
+                    .catch(() => { button.disabled = false; });
+            }
+            const larger = document.getElementById('load-larger');
+            const smaller = document.getElementById('load-smaller');
+            if (larger) {
+                larger.addEventListener('click', () => loadPage(larger, true));
+            }
+            if (smaller) {
+                smaller.addEventListener('click', () => loadPage(smaller, false));
+            }
         });
     </script>
 </body>
 </html>
 """
 
+class RecentDatasets:
+    """Per-worker LRU of recently submitted lists, for paging through the sorted order
+
+    Keys are content hashes, so resubmitting the same list reuses its entry.
+    Each list is sorted once, on its first page request.
+    """
+
+    def __init__(self, max_items, max_bytes):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # id -> [values, sorted?, bytes counted by add]
+        self.size = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _nbytes(values):
+        return len(values) * (values.itemsize if isinstance(values, array) else 32)
+
+    def add(self, values):
+        """Store values and return their id, or None if they are too large to keep"""
+        nbytes = self._nbytes(values)
+        if nbytes > self.max_bytes:
+            return None
+        data = memoryview(values).cast('B') if isinstance(values, array) else repr(values).encode('ascii')
+        dataset_id = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self.lock:
+            if dataset_id in self.entries:
+                self.entries.move_to_end(dataset_id)
+                return dataset_id
+            self.entries[dataset_id] = [values, False, nbytes]
+            self.size += nbytes
+            while len(self.entries) > self.max_items or self.size > self.max_bytes:
+                _, (_, _, old_nbytes) = self.entries.popitem(last=False)
+                self.size -= old_nbytes
+        return dataset_id
+
+    def page(self, dataset_id, offset, limit):
+        """Return (count, values at descending ranks offset+1..offset+limit), or None if unknown"""
+        with self.lock:
+            entry = self.entries.get(dataset_id)
+            if entry is None:
+                return None
+            self.entries.move_to_end(dataset_id)
+            values, is_sorted, _ = entry
+        if not is_sorted:
+            values = sort_descending(values)
+            with self.lock:
+                entry[0], entry[1] = values, True
+        return len(values), [int(v) for v in values[offset:offset + limit]]
+
+recent_datasets = RecentDatasets(RECENT_DATASETS, RECENT_DATASETS_MAX_BYTES)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     result = None
     n = None
-    sorted_numbers = None
+    window = None
+    count = None
+    dataset_id = None
+    numbers_value = None
     
     if request.method == 'POST':
-        numbers = request.form['numbers']
-        n = int(request.form['n'])
+        # Parse the numbers as the body streams in rather than through request.form,
+        # so a large input is never held as one string plus lists of pieces
+        form = StreamingForm(iter_chunks(request.stream), 'numbers', echo_limit=ECHO_LIMIT)
+        pieces = iter(form)
+        try:
+            num_list = read_numbers(pieces)
+        except ValueError:
+            num_list = None
+            for _ in pieces:  # n comes after the numbers
+                pass
+        if 'numbers' not in form.fields or 'n' not in form.fields:
+            abort(400)
+        numbers_value = form.echo
+        n = int(form.fields['n'])
         
         try:
-            # Parse and validate numbers
-            num_list = [int(x.strip()) for x in numbers.split(',') if x.strip()]
+            if num_list is None:
+                raise ValueError("Invalid number")
             
             if not num_list:
                 result = "Error: Please enter at least one valid number"
+            elif n < 1:
+                result = "Error: N must be at least 1"
             elif n > len(num_list):
                 result = "N is too large"
             else:
-                # Sort in descending order and find nth largest
-                sorted_list = sorted(num_list, reverse=True)
-                result = sorted_list[n-1]
-                sorted_numbers = sorted_list
+                # Select n and its neighbours without sorting everything; the
+                # page fetches more of the sorted order from /api/nth/page
+                count = len(num_list)
+                ranks = range(max(1, n - CONTEXT_RADIUS), min(count, n + CONTEXT_RADIUS) + 1)
+                window = list(zip(ranks, nth_largest_many(num_list, list(ranks))))
+                result = window[n - ranks[0]][1]
+                if len(ranks) < count:
+                    dataset_id = recent_datasets.add(num_list)
                 
         except ValueError:
             result = "Error: Please enter valid numbers separated by commas"
@@ -453,8 +632,333 @@ def index():
     return render_template_string(HTML_TEMPLATE, 
                                 result=result, 
                                 n=n, 
-                                sorted_numbers=sorted_numbers,
-                                request=request)
+                                window=window,
+                                count=count,
+                                dataset_id=dataset_id,
+                                page_size=PAGE_SIZE,
+                                numbers_value=numbers_value)
+
+def parse_rank(k, count):
+    """Turn a requested k into an nth-largest rank
+
+    3 (or "3") means the 3rd largest; "p99" means the 99th percentile
+    by nearest rank, i.e. the value that 99% of the numbers do not exceed.
+    """
+    if isinstance(k, str) and k[:1].lower() == 'p':
+        try:
+            # Exact rational arithmetic: as floats, 7 / 100 * 100 rounds up to 8
+            percentile = Fraction(k[1:])
+        except (ValueError, ZeroDivisionError):
+            raise ValueError(f"Invalid percentile: {k}")
+        if not 0 < percentile <= 100:
+            raise ValueError(f"Percentile must be in (0, 100]: {k}")
+        return count - math.ceil(percentile * count / 100) + 1
+    if isinstance(k, bool) or not isinstance(k, (int, str)):
+        raise ValueError(f"Invalid k: {k!r}")
+    try:
+        n = int(k)
+    except ValueError:
+        raise ValueError(f"Invalid k: {k!r}")
+    if not 1 <= n <= count:
+        raise ValueError(f"k={n} is out of range for {count} numbers")
+    return n
+
+def read_int64_body():
+    """Request body as little-endian int64 values (raises ValueError if misaligned)"""
+    body = request.get_data()
+    if len(body) % 8:
+        raise ValueError("Binary body must be a whole number of little-endian int64 values")
+    numbers = array('q')
+    numbers.frombytes(body)
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return numbers
+
+@app.route('/api/nth', methods=['POST'])
+def api_nth():
+    """Answer several nth-largest queries over one list in a single pass
+
+    Accepts JSON {"numbers": [...], "ks": [1, 10, "p99"]}, or the numbers as
+    raw little-endian int64 (application/octet-stream) or comma/whitespace
+    separated text (text/plain, parsed as it streams in) with the ks in the
+    query string (?k=1&k=10&k=p99).
+    """
+    numbers = None
+    top = None
+    try:
+        if request.mimetype == 'application/octet-stream':
+            numbers = read_int64_body()
+            ks = request.args.getlist('k')
+        elif request.mimetype == 'text/plain':
+            ks = request.args.getlist('k')
+            chunks = iter_chunks(request.stream)
+            if ks and all(k.isdigit() for k in ks) and max(map(int, ks)) <= TOP_K_STREAM_LIMIT:
+                # Only the largest max(k) values matter, so keep just those
+                top, count = top_k(chunks, max(map(int, ks)))
+            else:
+                numbers = read_numbers(chunks)
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({'error': 'Expected a JSON object with "numbers" and "ks"'}), 400
+            numbers = data.get('numbers')
+            ks = data.get('ks')
+            if not isinstance(numbers, list) or any(type(x) is not int for x in numbers):
+                return jsonify({'error': '"numbers" must be a list of integers'}), 400
+
+        if top is None:
+            count = len(numbers)
+        if not count:
+            return jsonify({'error': 'Please provide at least one number'}), 400
+        if not isinstance(ks, list) or not ks:
+            return jsonify({'error': 'Please provide at least one k'}), 400
+
+        ns = [parse_rank(k, count) for k in ks]
+        if top is not None:
+            values = [top[n - 1] for n in ns]
+        else:
+            values = nth_largest_many(numbers, ns)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'count': count,
+        'results': [{'k': k, 'n': n, 'value': value} for k, n, value in zip(ks, ns, values)]
+    })
+
+def approx_results(sketch, ks):
+    """Estimated values for ks with the ranks they are guaranteed to fall within"""
+    ns = [parse_rank(k, sketch.count) for k in ks]
+    slack = math.ceil(sketch.error * sketch.count)
+    results = []
+    for k, n, value in zip(ks, ns, sketch.nth_largest_many(ns)):
+        exact = n in (1, sketch.count)
+        results.append({
+            'k': k,
+            'n': n,
+            'value': value,
+            'rank_low': n if exact else max(1, n - slack),
+            'rank_high': n if exact else min(sketch.count, n + slack),
+        })
+    return results
+
+@app.route('/api/nth/approx', methods=['POST'])
+def api_nth_approx():
+    """Estimate nth-largest values of an arbitrarily large streamed body in bounded memory
+
+    The body is comma/whitespace separated text/plain or raw little-endian
+    int64 (application/octet-stream), read chunk by chunk into a KLL sketch.
+    Query string: k (repeatable, ranks or "pXX"), error (normalized rank
+    error, default 0.01), and sketch=1 to also return the sketch for
+    merging with others via /api/nth/approx/merge.
+    """
+    ks = request.args.getlist('k')
+    try:
+        sketch = KLLSketch(error=float(request.args.get('error', DEFAULT_ERROR)))
+        chunks = iter_chunks(request.stream)
+        if request.mimetype == 'application/octet-stream':
+            for batch in iter_int64_batches(chunks):
+                sketch.update_many(batch)
+        else:
+            for tokens in iter_token_batches(chunks):
+                sketch.update_many([int(token) for token in tokens])
+        if not sketch.count:
+            return jsonify({'error': 'Please provide at least one number'}), 400
+        results = approx_results(sketch, ks)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = {'count': sketch.count, 'error': sketch.error, 'results': results}
+    if request.args.get('sketch') == '1':
+        response['sketch'] = sketch.to_dict()
+    return jsonify(response)
+
+@app.route('/api/nth/approx/merge', methods=['POST'])
+def api_nth_approx_merge():
+    """Merge sketches from /api/nth/approx: JSON {"sketches": [...], "ks": [...]}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('sketches'), list) or not data['sketches']:
+        return jsonify({'error': 'Expected a JSON object with a non-empty "sketches" list'}), 400
+    ks = data.get('ks', [])
+    if not isinstance(ks, list):
+        return jsonify({'error': '"ks" must be a list'}), 400
+    try:
+        sketches = [KLLSketch.from_dict(item) if isinstance(item, dict) else None for item in data['sketches']]
+        if None in sketches:
+            raise ValueError("Malformed sketch")
+        merged = sketches[0]
+        for other in sketches[1:]:
+            merged.merge(other)
+        if not merged.count:
+            return jsonify({'error': 'The sketches are empty'}), 400
+        results = approx_results(merged, ks)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'count': merged.count, 'error': merged.error, 'results': results, 'sketch': merged.to_dict()})
+
+@app.route('/api/nth/page')
+def api_nth_page():
+    """One page of a recently submitted list in descending order
+
+    ?id=<dataset id from the result page>&offset=0&limit=50; offset counts
+    ranks already seen, so the first value returned has rank offset + 1.
+    """
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    if offset < 0 or not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'offset must be >= 0 and limit between 1 and {MAX_PAGE_SIZE}'}), 400
+
+    page = recent_datasets.page(request.args.get('id', ''), offset, limit)
+    if page is None:
+        return jsonify({'error': 'Dataset expired, please submit it again'}), 404
+    count, values = page
+    return jsonify({'count': count, 'offset': offset, 'values': values})
+
+@app.route('/datasets', methods=['POST'])
+def create_dataset():
+    """Store a list once for repeated queries; answers {"id": ..., "count": ...}
+
+    The body is JSON {"numbers": [...]}, raw little-endian int64
+    (application/octet-stream) or comma/whitespace separated text/plain.
+    Values must fit in 64-bit integers. Uploading the same list again
+    returns the same id. A dataset larger than the whole store's byte
+    budget (DATASET_MAX_BYTES) is refused with 413.
+    """
+    try:
+        if request.mimetype == 'application/octet-stream':
+            numbers = read_int64_body()
+        elif request.mimetype == 'text/plain':
+            numbers = read_numbers(iter_chunks(request.stream))
+        else:
+            data = request.get_json(silent=True)
+            numbers = data.get('numbers') if isinstance(data, dict) else None
+            if not isinstance(numbers, list) or any(type(x) is not int for x in numbers):
+                return jsonify({'error': 'Expected a JSON object with "numbers", a list of integers'}), 400
+        if not numbers:
+            return jsonify({'error': 'Please provide at least one number'}), 400
+        if not isinstance(numbers, array):
+            numbers = array('q', numbers)
+    except OverflowError:
+        return jsonify({'error': 'Numbers must fit in 64-bit integers'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        dataset_id, count, created = get_store().add(numbers)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 413
+    return jsonify({'id': dataset_id, 'count': count}), 201 if created else 200
+
+def get_dataset_or_404(dataset_id):
+    dataset = get_store().get(dataset_id)
+    if dataset is None:
+        abort(404, description='Unknown or expired dataset')
+    return dataset
+
+def int_arg(name):
+    """Required integer query argument, or a 400"""
+    try:
+        return int(request.args[name])
+    except (KeyError, ValueError):
+        abort(400, description=f'{name} must be an integer')
+
+@app.route('/datasets/<dataset_id>/nth')
+def dataset_nth(dataset_id):
+    """?n=3 for the 3rd largest, or ?n=p99 for a nearest-rank percentile"""
+    dataset = get_dataset_or_404(dataset_id)
+    try:
+        n = parse_rank(request.args.get('n', ''), len(dataset))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'id': dataset_id, 'count': len(dataset), 'n': n, 'value': dataset.nth_largest(n)})
+
+@app.route('/datasets/<dataset_id>/rank')
+def dataset_rank(dataset_id):
+    """?value=x: how many values are greater than / equal to x, and x's rank from the top"""
+    dataset = get_dataset_or_404(dataset_id)
+    value = int_arg('value')
+    greater, equal = dataset.rank(value)
+    return jsonify({
+        'id': dataset_id,
+        'count': len(dataset),
+        'value': value,
+        'rank': greater + 1,
+        'greater': greater,
+        'equal': equal,
+    })
+
+@app.route('/datasets/<dataset_id>/range')
+def dataset_range(dataset_id):
+    """?lo=a&hi=b: how many values fall in [a, b]"""
+    dataset = get_dataset_or_404(dataset_id)
+    lo, hi = int_arg('lo'), int_arg('hi')
+    return jsonify({'id': dataset_id, 'count': len(dataset), 'lo': lo, 'hi': hi, 'in_range': dataset.count_between(lo, hi)})
+
+@app.route('/streams/<name>', methods=['PUT'])
+def create_stream(name):
+    """Create or reset a rolling window: {"window": 1000} and/or {"seconds": 60}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object with "window" and/or "seconds"'}), 400
+    size, seconds = data.get('window'), data.get('seconds')
+    if (size is not None and type(size) is not int) or \
+            (seconds is not None and (isinstance(seconds, bool) or not isinstance(seconds, (int, float)))):
+        return jsonify({'error': '"window" must be an integer and "seconds" a number'}), 400
+    try:
+        window = streams.create(name, size, seconds)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'name': name, 'window': window.size, 'seconds': window.seconds}), 201
+
+@app.route('/streams/<name>', methods=['DELETE'])
+def delete_stream(name):
+    if not streams.delete(name):
+        abort(404, description='Unknown stream')
+    return '', 204
+
+def get_stream_or_404(name):
+    window = streams.get(name)
+    if window is None:
+        abort(404, description='Unknown stream')
+    return window
+
+@app.route('/streams/<name>/values', methods=['POST'])
+def append_stream_values(name):
+    """Append JSON {"values": [...]} (integers or floats) or comma/whitespace separated text/plain integers"""
+    window = get_stream_or_404(name)
+    try:
+        if request.mimetype == 'text/plain':
+            values = read_numbers(iter_chunks(request.stream))
+        else:
+            data = request.get_json(silent=True)
+            values = data.get('values') if isinstance(data, dict) else None
+            if not isinstance(values, list) or any(type(x) not in (int, float) or x != x for x in values):
+                return jsonify({'error': 'Expected a JSON object with "values", a list of numbers'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    window.extend(values)
+    return jsonify({'name': name, 'appended': len(values), 'count': window.count()})
+
+@app.route('/streams/<name>/nth')
+def stream_nth(name):
+    """?n=5 for the 5th largest value in the current window, or ?n=p99"""
+    window = get_stream_or_404(name)
+    k = request.args.get('n', '')
+    try:
+        n, value, count = window.nth_largest(lambda count: parse_rank(k, count))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'name': name, 'count': count, 'n': n, 'value': value})
+
+@app.errorhandler(400)
+@app.errorhandler(404)
+def json_error(e):
+    if request.path.startswith(('/api/', '/datasets', '/streams')):
+        return jsonify({'error': e.description}), e.code
+    return e
 
 @app.route('/health')
 def health_check():
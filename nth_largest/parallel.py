@@ -0,0 +1,125 @@
+"""Selection on very large int64 arrays across several processes.
+
+The array is copied once into shared memory, and a random sample picks a
+narrow value interval [lo, hi] around each wanted rank. In a single pass
+each worker process reports, for its shard, how many values fall below lo
+and which values fall inside [lo, hi]. The parent then only has to select
+among those few candidates. If the sample was unlucky and a rank falls
+outside its interval, that rank is selected serially with np.partition.
+
+Engaged by selection.nth_largest / nth_largest_many for arrays of at least
+PARALLEL_CONFIG['min_size'] values when more than one worker is configured.
+"""
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from selection import np
+
+PARALLEL_CONFIG = {
+    'workers': int(os.environ.get('SELECT_WORKERS', os.cpu_count() or 1)),
+    'min_size': int(os.environ.get('PARALLEL_MIN_SIZE', 5000000)),
+}
+
+SAMPLE_SIZE = 100000
+# Half-width of each interval, in sample positions: ~4 standard deviations
+INTERVAL_SIGMAS = 4
+
+_executors = {}
+_executors_pid = None
+_executors_lock = threading.Lock()
+
+def get_executor(workers):
+    """Return this process's pool with `workers` processes, creating it after fork"""
+    global _executors, _executors_pid
+    with _executors_lock:
+        if _executors_pid != os.getpid():
+            _executors = {}
+            _executors_pid = os.getpid()
+        if workers not in _executors:
+            # Forking a threaded web worker is unsafe, so start children cleanly
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _executors[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _executors[workers]
+
+def discard_executor(workers, executor):
+    """Forget a broken pool (e.g. a worker was killed) so the next call starts a fresh one"""
+    with _executors_lock:
+        if _executors.get(workers) is executor:
+            del _executors[workers]
+    executor.shutdown(wait=False)
+
+def _scan_shard(name, size, start, stop, intervals):
+    """Worker: for each (lo, hi), count values below lo and collect those within"""
+    shm = shared_memory.SharedMemory(name=name)
+    shard = None
+    try:
+        shard = np.ndarray((size,), dtype=np.int64, buffer=shm.buf)[start:stop]
+        results = []
+        for lo, hi in intervals:
+            below = int(np.count_nonzero(shard < lo))
+            inside = shard[(shard >= lo) & (shard <= hi)]
+            results.append((below, inside))
+        return results
+    finally:
+        shard = None  # release the buffer before closing
+        shm.close()
+
+def _intervals(arr, ks):
+    """A value interval per k, likely to contain the k-th smallest value"""
+    m = len(arr)
+    rng = np.random.default_rng()
+    sample = np.sort(arr[rng.integers(0, m, size=min(SAMPLE_SIZE, m))])
+    s = len(sample)
+    half = int(INTERVAL_SIGMAS * math.sqrt(s)) + 1
+    info = np.iinfo(np.int64)
+    intervals = []
+    for k in ks:
+        position = k * s // m
+        lo = int(sample[position - half]) if position - half >= 0 else int(info.min)
+        hi = int(sample[position + half]) if position + half < s else int(info.max)
+        intervals.append((lo, hi))
+    return intervals
+
+def parallel_select(arr, ks, workers=None):
+    """Return {k: k-th smallest (0-based)} of an int64 array, or None if not worth parallelizing"""
+    workers = workers or PARALLEL_CONFIG['workers']
+    if np is None or workers < 2 or len(arr) < 2 * workers:
+        return None
+    m = len(arr)
+    ks = sorted(set(ks))
+    intervals = _intervals(arr, ks)
+
+    shm = shared_memory.SharedMemory(create=True, size=m * 8)
+    shared = None
+    try:
+        shared = np.ndarray((m,), dtype=np.int64, buffer=shm.buf)
+        np.copyto(shared, arr, casting='no')
+        bounds = [m * i // workers for i in range(workers + 1)]
+        executor = get_executor(workers)
+        try:
+            futures = [executor.submit(_scan_shard, shm.name, m, start, stop, intervals)
+                       for start, stop in zip(bounds, bounds[1:])]
+            shard_results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            discard_executor(workers, executor)
+            return None  # the caller selects serially
+
+        found = {}
+        for i, k in enumerate(ks):
+            below = sum(result[i][0] for result in shard_results)
+            candidates = np.concatenate([result[i][1] for result in shard_results])
+            if below <= k < below + len(candidates):
+                found[k] = int(np.partition(candidates, k - below)[k - below])
+            else:
+                found[k] = int(np.partition(shared, k)[k])
+        return found
+    finally:
+        shared = None  # release the buffer before closing
+        shm.close()
+        shm.unlink()
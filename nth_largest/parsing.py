@@ -0,0 +1,184 @@
+"""Incremental parsing of large number lists for the nth_largest app.
+
+Request bodies are read in fixed-size chunks (chunked uploads included), so
+the full text is never held in memory at once:
+
+* StreamingForm decodes an application/x-www-form-urlencoded body on the fly
+  and streams out one field (the numbers) while collecting the small ones
+* read_numbers packs the parsed values into a compact array('q')
+* top_k keeps only the k largest values, so memory is O(k)
+"""
+import heapq
+import sys
+from array import array
+from urllib.parse import unquote_to_bytes
+
+CHUNK_SIZE = 64 * 1024
+MAX_TOKEN_LENGTH = 4300  # digits; Python's default int() limit
+MAX_FIELD_LENGTH = 64 * 1024  # for the small, non-streamed form fields
+
+def iter_chunks(stream, chunk_size=CHUNK_SIZE):
+    """Yield successive byte chunks read from a file-like stream"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def iter_token_batches(chunks):
+    """Yield lists of number tokens from comma/whitespace separated byte chunks
+
+    A token cut in half by a chunk boundary is carried over to the next chunk.
+    """
+    tail = b''
+    for chunk in chunks:
+        data = tail + chunk.replace(b',', b' ')
+        tokens = data.split()
+        if tokens and not data[-1:].isspace():
+            tail = tokens.pop()
+            if len(tail) > MAX_TOKEN_LENGTH:
+                raise ValueError("Number too long")
+        else:
+            tail = b''
+        if tokens:
+            yield tokens
+    if tail:
+        yield [tail]
+
+def iter_int64_batches(chunks):
+    """Yield array('q') batches from raw little-endian int64 byte chunks
+
+    Raises ValueError if the total length is not a multiple of 8.
+    """
+    tail = b''
+    for chunk in chunks:
+        data = tail + chunk
+        usable = len(data) - len(data) % 8
+        tail = data[usable:]
+        if usable:
+            batch = array('q')
+            batch.frombytes(data[:usable])
+            if sys.byteorder == 'big':
+                batch.byteswap()
+            yield batch
+    if tail:
+        raise ValueError("Binary body must be a whole number of little-endian int64 values")
+
+def iter_numbers(chunks):
+    """Yield ints parsed from comma/whitespace separated byte chunks"""
+    for tokens in iter_token_batches(chunks):
+        for token in tokens:
+            yield int(token)
+
+def read_numbers(chunks):
+    """Parse every number into an array('q'), or a list if any value overflows int64"""
+    numbers = array('q')
+    for tokens in iter_token_batches(chunks):
+        batch = [int(token) for token in tokens]
+        if isinstance(numbers, array):
+            try:
+                numbers += array('q', batch)
+                continue
+            except OverflowError:
+                numbers = numbers.tolist()
+        numbers.extend(batch)
+    return numbers
+
+def top_k(chunks, k):
+    """Return (the k largest numbers in descending order, total count) in O(k) memory"""
+    top = []
+    count = 0
+    for tokens in iter_token_batches(chunks):
+        batch = [int(token) for token in tokens]
+        count += len(batch)
+        top = heapq.nlargest(k, top + batch)
+    return top, count
+
+class StreamingForm:
+    """Incrementally decoded application/x-www-form-urlencoded body
+
+    Iterating yields the decoded value of `stream_field` piece by piece as it
+    arrives; every other field is collected into `fields` (exhaust the
+    iterator first). `echo` keeps the streamed value too, as long as it stays
+    within `echo_limit` bytes, for re-rendering the form.
+    """
+
+    def __init__(self, chunks, stream_field, echo_limit=0):
+        self.chunks = chunks
+        self.stream_field = stream_field
+        self.echo_limit = echo_limit
+        self.echo = None
+        self.fields = {}
+
+    def _finish(self, name, parts):
+        if name == self.stream_field:
+            self.fields.setdefault(name, '')
+        else:
+            self.fields[name] = b''.join(parts).decode('utf-8', 'replace')
+
+    def __iter__(self):
+        echo_parts, echo_size = [], 0
+        key, name, parts = b'', None, []
+        in_value = False
+        pending = b''
+        for chunk in self.chunks:
+            buf = pending + chunk
+            pending = b''
+            pos = 0
+            while pos < len(buf):
+                if not in_value:
+                    ends = [i for i in (buf.find(b'=', pos), buf.find(b'&', pos)) if i != -1]
+                    if not ends:
+                        key += buf[pos:]
+                        if len(key) > MAX_FIELD_LENGTH:
+                            raise ValueError("Form field name too long")
+                        break
+                    end = min(ends)
+                    key += buf[pos:end]
+                    name = unquote_to_bytes(key.replace(b'+', b' ')).decode('utf-8', 'replace')
+                    key, parts = b'', []
+                    if buf[end:end + 1] == b'&':
+                        if name:
+                            self._finish(name, parts)
+                    else:
+                        in_value = True
+                    pos = end + 1
+                    continue
+
+                end = buf.find(b'&', pos)
+                segment = buf[pos:] if end == -1 else buf[pos:end]
+                if end == -1:
+                    # Hold back a percent escape split across chunks
+                    percent = segment.rfind(b'%', max(0, len(segment) - 2))
+                    if percent != -1:
+                        pending = segment[percent:]
+                        segment = segment[:percent]
+                decoded = unquote_to_bytes(segment.replace(b'+', b' '))
+                if name == self.stream_field:
+                    if echo_parts is not None:
+                        echo_size += len(decoded)
+                        echo_parts = echo_parts + [decoded] if echo_size <= self.echo_limit else None
+                    if decoded:
+                        yield decoded
+                else:
+                    parts.append(decoded)
+                    if sum(len(part) for part in parts) > MAX_FIELD_LENGTH:
+                        raise ValueError(f"Form field {name} too long")
+                if end == -1:
+                    break
+                self._finish(name, parts)
+                in_value, parts = False, []
+                pos = end + 1
+
+        if in_value:
+            decoded = unquote_to_bytes(pending.replace(b'+', b' '))
+            if name == self.stream_field:
+                if decoded:
+                    yield decoded
+            else:
+                parts.append(decoded)
+            self._finish(name, parts)
+        elif key:
+            self._finish(unquote_to_bytes(key.replace(b'+', b' ')).decode('utf-8', 'replace'), [])
+        if echo_parts is not None and self.stream_field in self.fields:
+            self.echo = b''.join(echo_parts).decode('utf-8', 'replace')
@@ -0,0 +1,180 @@
+"""Order-statistic selection for the nth_largest app.
+
+nth_largest(values, n) answers with the cheapest exact strategy for the input:
+
+* heapq.nlargest / heapq.nsmallest when n (or m - n) is small
+* NumPy's introselect (np.partition) for large inputs, when NumPy is installed
+  and the values fit in int64, spread across processes for very large ones
+  (see parallel.py)
+* a pure-Python introselect otherwise: quickselect on median-of-3 pivots that
+  switches to median-of-medians pivots once partitions stop shrinking, so
+  adversarial input still runs in O(m)
+"""
+import heapq
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure-Python paths cover everything
+    np = None
+
+HEAP_MAX_N = 64  # heap selection is O(m log n), best while n stays small
+NUMPY_MIN_SIZE = 4096  # below this, building the array costs more than it saves
+SMALL_SIZE = 32  # partitions this small are just sorted
+
+def to_int64_array(values):
+    """Return values as an int64 NumPy array (zero-copy where possible), or None"""
+    if np is None:
+        return None
+    if isinstance(values, np.ndarray):
+        return values
+    if isinstance(values, array) and values.typecode == 'q':
+        return np.frombuffer(values, dtype=np.int64)
+    try:
+        return np.array(values, dtype=np.int64)
+    except (OverflowError, TypeError, ValueError):
+        return None  # big or non-integer values stay on the pure-Python path
+
+def sort_descending(values):
+    """Return values sorted largest first (an int64 array when NumPy can hold them)"""
+    arr = to_int64_array(values)
+    if arr is not None:
+        return np.sort(arr)[::-1]
+    return sorted(values, reverse=True)
+
+def _partition_select(arr, ks):
+    """Return {k: k-th smallest} of an int64 array, in parallel for very large arrays"""
+    import parallel  # deferred: parallel imports this module
+    if len(arr) >= parallel.PARALLEL_CONFIG['min_size']:
+        found = parallel.parallel_select(arr, ks)
+        if found is not None:
+            return found
+    partitioned = np.partition(arr, ks)
+    return {k: int(partitioned[k]) for k in ks}
+
+def _median_of_medians(items):
+    """Pivot guaranteed to have at least ~30% of items on each side"""
+    medians = []
+    for start in range(0, len(items), 5):
+        group = sorted(items[start:start + 5])
+        medians.append(group[len(group) // 2])
+    return select(medians, len(medians) // 2)
+
+def select(values, k):
+    """Return the k-th smallest (0-based) element of values using introselect"""
+    items = values if isinstance(values, list) else list(values)
+    if not 0 <= k < len(items):
+        raise IndexError(f"k={k} out of range for {len(items)} values")
+    # Number of poorly balanced partitions tolerated before switching pivots
+    budget = len(items).bit_length()
+    while True:
+        size = len(items)
+        if size <= SMALL_SIZE:
+            return sorted(items)[k]
+        if budget > 0:
+            pivot = sorted((items[0], items[size // 2], items[-1]))[1]
+        else:
+            pivot = _median_of_medians(items)
+
+        lows = [x for x in items if x < pivot]
+        if k < len(lows):
+            remaining = lows
+        else:
+            highs = [x for x in items if x > pivot]
+            equal = size - len(lows) - len(highs)
+            if k < len(lows) + equal:
+                return pivot
+            k -= len(lows) + equal
+            remaining = highs
+
+        if len(remaining) > size * 3 // 4:
+            budget -= 1
+        items = remaining
+
+def select_many(values, ks):
+    """Return {k: k-th smallest} for several 0-based ks, sharing the partitioning work"""
+    result = {}
+    items = values if isinstance(values, list) else list(values)
+    wanted = sorted(set(ks))
+    if wanted and not (0 <= wanted[0] and wanted[-1] < len(items)):
+        raise IndexError(f"ks out of range for {len(items)} values")
+    # Each pending piece: (items, sorted ks inside it, index of its first item, pivot budget)
+    pending = [(items, wanted, 0, len(items).bit_length())] if wanted else []
+    while pending:
+        items, wanted, offset, budget = pending.pop()
+        if len(wanted) == 1:
+            result[wanted[0]] = select(items, wanted[0] - offset)
+            continue
+        size = len(items)
+        if size <= SMALL_SIZE:
+            ordered = sorted(items)
+            for k in wanted:
+                result[k] = ordered[k - offset]
+            continue
+        if budget > 0:
+            pivot = sorted((items[0], items[size // 2], items[-1]))[1]
+        else:
+            pivot = _median_of_medians(items)
+
+        lows = [x for x in items if x < pivot]
+        highs = [x for x in items if x > pivot]
+        low_end = offset + len(lows)
+        high_start = offset + size - len(highs)
+        low_ks = [k for k in wanted if k < low_end]
+        high_ks = [k for k in wanted if k >= high_start]
+        for k in wanted:
+            if low_end <= k < high_start:
+                result[k] = pivot
+        for part, part_ks, part_offset in ((lows, low_ks, offset), (highs, high_ks, high_start)):
+            if part_ks:
+                part_budget = budget - 1 if len(part) > size * 3 // 4 else budget
+                pending.append((part, part_ks, part_offset, part_budget))
+    return result
+
+def _scalar(value):
+    """Plain Python number for NumPy scalars (JSON and templates need those)"""
+    return value.item() if hasattr(value, 'item') else value
+
+def nth_largest(values, n):
+    """Return the n-th largest (1-based) element of values"""
+    m = len(values)
+    if not 1 <= n <= m:
+        raise ValueError(f"n must be between 1 and {m}")
+    k = m - n  # the same element, counted from the smallest
+
+    # Packed int64 buffers go straight to NumPy; for Python lists a small
+    # heap is cheaper than converting the whole list first
+    packed = isinstance(values, array) or (np is not None and isinstance(values, np.ndarray))
+    if m >= NUMPY_MIN_SIZE and (packed or min(n, k + 1) > HEAP_MAX_N):
+        arr = to_int64_array(values)
+        if arr is not None:
+            return _partition_select(arr, [k])[k]
+    if n <= HEAP_MAX_N:
+        return _scalar(heapq.nlargest(n, values)[-1])
+    if k < HEAP_MAX_N:
+        return _scalar(heapq.nsmallest(k + 1, values)[-1])
+    return _scalar(select(values, k))
+
+def nth_largest_many(values, ns):
+    """Return the n-th largest element for every n in ns in one partitioning pass"""
+    m = len(values)
+    for n in ns:
+        if not 1 <= n <= m:
+            raise ValueError(f"n must be between 1 and {m}")
+    if not ns:
+        return []
+
+    top_n = max(ns)
+    if top_n <= HEAP_MAX_N and not isinstance(values, array):
+        top = heapq.nlargest(top_n, values)
+        return [_scalar(top[n - 1]) for n in ns]
+
+    ks = sorted({m - n for n in ns})
+    found = None
+    if m >= NUMPY_MIN_SIZE or isinstance(values, array):
+        arr = to_int64_array(values)
+        if arr is not None:
+            found = _partition_select(arr, ks)
+    if found is None:
+        found = {k: _scalar(value) for k, value in select_many(values, ks).items()}
+    return [found[m - n] for n in ns]
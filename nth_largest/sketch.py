@@ -0,0 +1,187 @@
+"""Approximate order statistics in bounded memory with a KLL quantile sketch.
+
+KLL (Karnin, Lang, Liberty) keeps a stack of compactors: level h holds items
+that each stand for 2**h inputs. A full compactor is sorted and every other
+item (from a random start) is promoted to the next level. The sketch keeps
+O(k log(m / k)) items for m inputs. Ranks are off by at most about
+rank_error(k) * m with 99% confidence.
+
+Sketches built on different workers or chunks merge into one sketch with
+the same guarantee, so large inputs can be split up freely.
+"""
+import math
+import random
+from bisect import bisect_left
+from itertools import accumulate
+
+from selection import np
+
+DEFAULT_ERROR = 0.01
+MIN_K = 8
+MAX_K = 65536
+CAPACITY_DECAY = 2 / 3  # lower levels get smaller compactors
+
+def rank_error(k):
+    """Normalized rank error (99% confidence) of a sketch with parameter k"""
+    # Empirical fit for KLL published with Apache DataSketches
+    return 2.296 / k ** 0.9723
+
+def k_for_error(error):
+    """Smallest k whose rank error is within `error`"""
+    if not 0 < error < 1:
+        raise ValueError("error must be between 0 and 1")
+    k = math.ceil((2.296 / error) ** (1 / 0.9723))
+    return min(MAX_K, max(MIN_K, k))
+
+def _sorted(items):
+    if np is not None and isinstance(items, np.ndarray):
+        return np.sort(items)
+    return sorted(items)
+
+class KLLSketch:
+    """Mergeable quantile sketch; min and max are tracked exactly"""
+
+    def __init__(self, k=None, error=DEFAULT_ERROR):
+        self.k = k if k is not None else k_for_error(error)
+        self.compactors = [[]]
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._rng = random.Random()
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, math.ceil(self.k * CAPACITY_DECAY ** depth))
+
+    def _compact(self, items, level):
+        """Halve sorted-able items from `level`; the promoted half goes up a level
+
+        An odd item out stays at `level` so that no weight is lost.
+        """
+        items = _sorted(items)
+        if len(items) % 2:
+            self.compactors[level].append(items[-1].item() if hasattr(items[-1], 'item') else items[-1])
+            items = items[:-1]
+        if level + 1 == len(self.compactors):
+            self.compactors.append([])
+        return items[self._rng.getrandbits(1)::2]
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            if len(self.compactors[level]) >= self._capacity(level):
+                items, self.compactors[level] = self.compactors[level], []
+                promoted = self._compact(items, level)
+                self.compactors[level + 1].extend(promoted)
+            level += 1
+
+    def update(self, value):
+        self.update_many((value,))
+
+    def update_many(self, values):
+        """Add a batch of values (a list, array('q') or NumPy array)"""
+        if not len(values):
+            return
+        if np is not None and not isinstance(values, (list, tuple)):
+            batch = np.asarray(values)
+            low, high = batch.min().item(), batch.max().item()
+        else:
+            batch = list(values)
+            low, high = min(batch), max(batch)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.count += len(batch)
+
+        # Compact a large batch on its own first, so memory stays bounded by
+        # the batch rather than growing the lowest compactor
+        level = 0
+        while len(batch) >= max(2, self._capacity(level)):
+            batch = self._compact(batch, level)
+            level += 1
+        self.compactors[level].extend(batch.tolist() if hasattr(batch, 'tolist') else batch)
+        self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        if other.count == 0:
+            return self
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.k = min(self.k, other.k)
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def __len__(self):
+        """Items retained (not the number of inputs, see count)"""
+        return sum(len(items) for items in self.compactors)
+
+    @property
+    def error(self):
+        return rank_error(self.k)
+
+    def _weighted(self):
+        """Retained items with their weights, in ascending order"""
+        weighted = [(value, 1 << level) for level, items in enumerate(self.compactors) for value in items]
+        weighted.sort(key=lambda pair: pair[0])
+        return weighted
+
+    def rank(self, value):
+        """Estimated number of inputs less than or equal to value"""
+        return sum(1 << level for level, items in enumerate(self.compactors) for x in items if x <= value)
+
+    def nth_largest_many(self, ns):
+        """Estimated n-th largest input for each n (n=1 and n=count are exact)"""
+        for n in ns:
+            if not 1 <= n <= self.count:
+                raise ValueError(f"n must be between 1 and {self.count}")
+        weighted = self._weighted()
+        cumulative = list(accumulate(weight for _, weight in weighted))
+        results = []
+        for n in ns:
+            if n == 1:
+                results.append(self.max)
+                continue
+            if n == self.count:
+                results.append(self.min)
+                continue
+            # Compactions preserve total weight, so the item covering
+            # ascending rank count - n + 1 estimates the answer
+            results.append(weighted[bisect_left(cumulative, self.count - n + 1)][0])
+        return results
+
+    def nth_largest(self, n):
+        return self.nth_largest_many([n])[0]
+
+    def to_dict(self):
+        return {'k': self.k, 'count': self.count, 'min': self.min, 'max': self.max,
+                'compactors': self.compactors}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a sketch from to_dict() output; raises ValueError if malformed"""
+        try:
+            sketch = cls(k=int(data['k']))
+            sketch.count = int(data['count'])
+            sketch.min, sketch.max = data['min'], data['max']
+            sketch.compactors = [list(items) for items in data['compactors']] or [[]]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Malformed sketch")
+        if not MIN_K <= sketch.k <= MAX_K or sketch.count < 0:
+            raise ValueError("Malformed sketch")
+        if sum(len(items) << level for level, items in enumerate(sketch.compactors)) != sketch.count:
+            raise ValueError("Sketch weights do not add up to its count")
+        for items in sketch.compactors:
+            if any(isinstance(x, bool) or not isinstance(x, (int, float)) for x in items):
+                raise ValueError("Sketch values must be numbers")
+        if sketch.count == 0:
+            if sketch.min is not None or sketch.max is not None:
+                raise ValueError("An empty sketch has no min or max")
+        elif (any(isinstance(x, bool) or not isinstance(x, (int, float)) for x in (sketch.min, sketch.max))
+                or not sketch.min <= sketch.max):
+            raise ValueError("Sketch min and max must be numbers with min <= max")
+        return sketch
@@ -0,0 +1,190 @@
+"""Rolling-window order statistics for live metrics.
+
+A stream keeps the values of the last `size` observations, or of the last
+`seconds` seconds (capped at `size`), in an indexable skiplist, so each
+append and expiry is O(log w) and the n-th largest of the window is an
+O(log w) lookup instead of a re-sort.
+
+Streams live in the memory of one worker process; run the app with a single
+worker (e.g. gunicorn --workers 1 --threads 8) when using them.
+"""
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+STREAM_CONFIG = {
+    'max_streams': int(os.environ.get('STREAM_MAX_STREAMS', 100)),
+    'max_window': int(os.environ.get('STREAM_MAX_WINDOW', 1000000)),
+}
+
+class _End:
+    """Sentinel that sorts after every value"""
+
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+class _Node:
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, next, width):
+        self.value = value
+        self.next = next
+        self.width = width
+
+_NIL = _Node(_End(), [], [])
+
+class IndexableSkiplist:
+    """Sorted multiset with O(log n) insert, remove and access by index
+
+    Each link records how many elements it skips, so walking down the levels
+    while counting widths finds the i-th smallest element.
+    """
+
+    def __init__(self, expected_size=1024):
+        self.size = 0
+        self.levels = max(1, int(math.log2(max(2, expected_size))) + 1)
+        self.head = _Node(None, [_NIL] * self.levels, [1] * self.levels)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError(f"index {i} out of range for {self.size} values")
+        node = self.head
+        i += 1
+        for level in reversed(range(self.levels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value):
+        # Last node before value on each level, and the distance walked there
+        chain = [None] * self.levels
+        steps = [0] * self.levels
+        node = self.head
+        for level in reversed(range(self.levels)):
+            while node.next[level].value <= value:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        height = min(self.levels, 1 - int(math.log2(1.0 - random.random())))
+        new = _Node(value, [None] * height, [None] * height)
+        walked = 0
+        for level in range(height):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - walked
+            prev.width[level] = walked + 1
+            walked += steps[level]
+        for level in range(height, self.levels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        chain = [None] * self.levels
+        node = self.head
+        for level in reversed(range(self.levels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is _NIL or target.value != value:
+            raise KeyError(value)
+
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.levels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+class RollingWindow:
+    """The last `size` values, or those from the last `seconds` seconds"""
+
+    def __init__(self, size, seconds=None):
+        self.size = size
+        self.seconds = seconds
+        self.entries = deque()  # (timestamp, value), oldest first
+        self.ordered = IndexableSkiplist(size)
+        self.lock = threading.Lock()
+
+    def _expire(self, now):
+        cutoff = now - self.seconds if self.seconds is not None else None
+        while self.entries and (len(self.entries) > self.size or
+                                (cutoff is not None and self.entries[0][0] <= cutoff)):
+            _, value = self.entries.popleft()
+            self.ordered.remove(value)
+
+    def extend(self, values, now=None):
+        now = time.monotonic() if now is None else now
+        values = list(values)[-self.size:]  # older values would expire at once
+        with self.lock:
+            for value in values:
+                self.entries.append((now, value))
+                self.ordered.insert(value)
+            self._expire(now)
+
+    def count(self, now=None):
+        with self.lock:
+            self._expire(time.monotonic() if now is None else now)
+            return len(self.ordered)
+
+    def nth_largest(self, rank, now=None):
+        """Return (n, the n-th largest value in the window, window count)
+
+        rank is n itself or a function mapping the window count to n, so
+        percentiles use the same count as the lookup.
+        """
+        with self.lock:
+            self._expire(time.monotonic() if now is None else now)
+            count = len(self.ordered)
+            n = rank(count) if callable(rank) else rank
+            if not 1 <= n <= count:
+                raise ValueError(f"n must be between 1 and {count}")
+            return n, self.ordered[count - n], count
+
+class StreamRegistry:
+    """Named rolling windows of this worker"""
+
+    def __init__(self, max_streams, max_window):
+        self.max_streams = max_streams
+        self.max_window = max_window
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def create(self, name, size=None, seconds=None):
+        """Create (or replace) a stream; raises ValueError for bad limits"""
+        if seconds is None and size is None:
+            raise ValueError('Provide "window" (a count) and/or "seconds"')
+        if size is None:
+            size = self.max_window
+        if not 1 <= size <= self.max_window:
+            raise ValueError(f"window must be between 1 and {self.max_window}")
+        if seconds is not None and not seconds > 0:
+            raise ValueError("seconds must be positive")
+        window = RollingWindow(size, seconds)
+        with self.lock:
+            if name not in self.streams and len(self.streams) >= self.max_streams:
+                raise ValueError(f"At most {self.max_streams} streams")
+            self.streams[name] = window
+        return window
+
+    def get(self, name):
+        return self.streams.get(name)
+
+    def delete(self, name):
+        with self.lock:
+            return self.streams.pop(name, None) is not None
+
+streams = StreamRegistry(**STREAM_CONFIG)
@@ -0,0 +1,22 @@
+"""Rank parsing in main.parse_rank (run from this directory: python -m pytest)"""
+import pytest
+
+from main import parse_rank
+
+def test_every_integer_percentile_is_the_nearest_rank():
+    # Over 1..100, pN must pick the value N
+    ascending = list(range(1, 101))
+    descending = sorted(ascending, reverse=True)
+    for p in range(1, 101):
+        assert descending[parse_rank(f'p{p}', len(ascending)) - 1] == p
+
+def test_percentiles_are_exact():
+    # 7 / 100 * 100 is 7.000000000000001 in floats, one rank too far
+    assert parse_rank('p7', 100) == 94
+    assert parse_rank('p0.5', 100) == 100
+    assert parse_rank('p100', 100) == 1
+
+@pytest.mark.parametrize('rank', ['p0', 'p-1', 'p100.5', 'pnan', 'px'])
+def test_invalid_percentiles_are_rejected(rank):
+    with pytest.raises(ValueError):
+        parse_rank(rank, 100)
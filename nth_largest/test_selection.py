@@ -0,0 +1,10 @@
+"""Selection against a full sort (run from this directory: python -m pytest)"""
+import random
+
+import selection
+
+def test_nth_largest_matches_sorting():
+    for _ in range(200):
+        values = [random.randint(-50, 50) for _ in range(random.randint(1, 300))]
+        n = random.randint(1, len(values))
+        assert selection.nth_largest(values, n) == sorted(values, reverse=True)[n - 1]
@@ -0,0 +1,188 @@
+"""Benchmark the matrix multiplication backends.
+
+    python benchmark.py                       # n = 2, 10, 100, 500
+    python benchmark.py --sizes 50 200 --repeat 5
+    python benchmark.py --check               # kernels vs the naive loop first
+    python benchmark.py --sizes 1000 2000 --workers 1 2 4 8
+    python benchmark.py --sizes 500 1000 --densities 0.001 0.01 0.05 0.2
+    python benchmark.py --sizes 100 500 --modes
+
+Times (in ms, best of --repeat) to multiply two random n×n integer matrices
+given as lists of lists, including conversion in and out of NumPy:
+  naive     the old i-j-k triple loop           (only for n <= --naive-max)
+  rows      matmul.multiply_rows (zip/sum)
+  tiled     matmul.multiply_tiled
+  strassen  matmul.multiply_strassen            (tiled below its crossover)
+  int64     matmul.multiply_numpy on integers   (overflow-checked int64)
+  float64   matmul.multiply_numpy on floats     (BLAS)
+  auto      matmul.multiply
+
+With --workers, a second table times n×n int64 and float64 NumPy products
+for n >= 500 with parallel.parallel_multiply for each worker count (1 means
+a plain a @ b), including the copies into shared memory.
+
+With --densities, a table for n >= 100 and each share of nonzero entries
+compares dense int64 and float64 products with the sparse kernels on the
+same integer matrices: csr (sparse.multiply_csr, CSR inputs and output),
+csr*dense (sparse.multiply_csr_dense) and auto (matmul.multiply on lists,
+density measurement and conversions included).
+
+With --modes, a table times matmul.multiply_mode in each numeric mode:
+int64 and float64 on entries in [-1000, 1000], exact on the same and on
+128-bit entries (exact128), and mod for several moduli on full-width
+residues (2^61-1 is too wide for the float64 kernel and runs in Python).
+"""
+import argparse
+import random
+import time
+
+import matmul
+import parallel
+import sparse
+
+def best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def naive(a, b):
+    size = len(a)
+    result = [[0 for _ in range(size)] for _ in range(size)]
+    for i in range(size):
+        for j in range(size):
+            for k in range(size):
+                result[i][j] += a[i][k] * b[k][j]
+    return result
+
+def random_matrix(n, make, cols=None):
+    return [[make() for _ in range(cols or n)] for _ in range(n)]
+
+def sparse_matrix(n, density):
+    return [[random.randint(-1000, 1000) if random.random() < density else 0 for _ in range(n)]
+            for _ in range(n)]
+
+MODULI = [('mod 2^16+1', 2 ** 16 + 1), ('mod 1e9+7', 10 ** 9 + 7), ('mod 2^31-1', 2 ** 31 - 1),
+          ('mod 2^61-1', 2 ** 61 - 1)]
+
+def check(trials=200):
+    """Compare every kernel with the naive loop on random rectangular inputs"""
+    for _ in range(trials):
+        m, k, n = (random.randint(1, 48) for _ in range(3))
+        a = random_matrix(m, lambda: random.randint(-10 ** 12, 10 ** 12), k)
+        b = random_matrix(k, lambda: random.randint(-10 ** 12, 10 ** 12), n)
+        expected = [[sum(a[i][x] * b[x][j] for x in range(k)) for j in range(n)] for i in range(m)]
+        results = {
+            'rows': matmul.multiply_rows(a, b),
+            'tiled': matmul.multiply_tiled(a, b, tile=random.randint(1, 16)),
+            'strassen': matmul.multiply_strassen(a, b, crossover=random.randint(2, 8)),
+            'python': matmul.multiply_python(a, b),
+            'auto': matmul.multiply(a, b),
+            'csr': sparse.multiply_csr(sparse.CSRMatrix.from_dense(a), sparse.CSRMatrix.from_dense(b)).to_dense(),
+            'csr*dense': sparse.multiply_csr_dense(sparse.CSRMatrix.from_dense(a), b),
+        }
+        for name, modulus in MODULI:
+            results[name] = matmul.multiply_mode(a, b, 'mod', modulus)
+            expected_mod = [[x % modulus for x in row] for row in expected]
+            assert results[name] == expected_mod, f"{name} differs from the naive product for {m}x{k} @ {k}x{n}"
+        for name, result in results.items():
+            if not name.startswith('mod'):
+                assert result == expected, f"{name} differs from the naive product for {m}x{k} @ {k}x{n}"
+    print(f"check: all kernels match the naive product on {trials} random shapes")
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='*', type=int, default=[2, 10, 100, 500])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--naive-max', type=int, default=200)
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--workers', nargs='*', type=int, default=[])
+    parser.add_argument('--densities', nargs='*', type=float, default=[])
+    parser.add_argument('--modes', action='store_true')
+    args = parser.parse_args()
+    if args.check:
+        check()
+
+    has_numpy = matmul.np is not None
+    print(f"{'n':>6} {'naive':>10} {'rows':>10} {'tiled':>10} {'strassen':>10} "
+          f"{'int64':>10} {'float64':>10} {'auto':>10}")
+    for n in args.sizes:
+        a = random_matrix(n, lambda: random.randint(-1000, 1000))
+        b = random_matrix(n, lambda: random.randint(-1000, 1000))
+        fa = random_matrix(n, random.random)
+        fb = random_matrix(n, random.random)
+        timings = [
+            best_time(lambda: naive(a, b), args.repeat) if n <= args.naive_max else None,
+            best_time(lambda: matmul.multiply_rows(a, b), args.repeat),
+            best_time(lambda: matmul.multiply_tiled(a, b), args.repeat),
+            best_time(lambda: matmul.multiply_strassen(a, b), args.repeat),
+            best_time(lambda: matmul.multiply_numpy(a, b), args.repeat) if has_numpy else None,
+            best_time(lambda: matmul.multiply_numpy(fa, fb), args.repeat) if has_numpy else None,
+            best_time(lambda: matmul.multiply(a, b), args.repeat),
+        ]
+        cells = ' '.join(f"{t:>10.3f}" if t is not None else f"{'-':>10}" for t in timings)
+        print(f"{n:>6} {cells}")
+
+    if args.densities:
+        print()
+        print(f"{'n':>6} {'density':>8} {'int64':>10} {'float64':>10} {'csr':>10} {'csr*dense':>10} {'auto':>10}")
+    for n in args.sizes if args.densities else []:
+        if n < 100:
+            continue
+        for density in args.densities:
+            a, b = sparse_matrix(n, density), sparse_matrix(n, density)
+            fa, fb = [[float(x) for x in row] for row in a], [[float(x) for x in row] for row in b]
+            csr_a, csr_b = sparse.CSRMatrix.from_dense(a), sparse.CSRMatrix.from_dense(b)
+            timings = [
+                best_time(lambda: matmul.multiply_numpy(a, b), args.repeat) if has_numpy else None,
+                best_time(lambda: matmul.multiply_numpy(fa, fb), args.repeat) if has_numpy else None,
+                best_time(lambda: sparse.multiply_csr(csr_a, csr_b), args.repeat),
+                best_time(lambda: sparse.multiply_csr_dense(csr_a, b), args.repeat),
+                best_time(lambda: matmul.multiply(a, b), args.repeat),
+            ]
+            cells = ' '.join(f"{t:>10.3f}" if t is not None else f"{'-':>10}" for t in timings)
+            print(f"{n:>6} {density:>8g} {cells}")
+
+    if args.modes:
+        print()
+        names = ['int64', 'float64', 'exact', 'exact128'] + [name for name, _ in MODULI]
+        print(f"{'n':>6} " + ' '.join(f"{name:>11}" for name in names))
+    for n in args.sizes if args.modes else []:
+        a = random_matrix(n, lambda: random.randint(-1000, 1000))
+        b = random_matrix(n, lambda: random.randint(-1000, 1000))
+        big_a = random_matrix(n, lambda: random.getrandbits(128))
+        big_b = random_matrix(n, lambda: random.getrandbits(128))
+        timings = [
+            best_time(lambda: matmul.multiply_mode(a, b, 'int64'), args.repeat),
+            best_time(lambda: matmul.multiply_mode(a, b, 'float64'), args.repeat),
+            best_time(lambda: matmul.multiply_mode(a, b, 'exact'), args.repeat),
+            best_time(lambda: matmul.multiply_mode(big_a, big_b, 'exact'), args.repeat),
+        ]
+        for _, modulus in MODULI:
+            mod_a = random_matrix(n, lambda: random.randrange(modulus))
+            mod_b = random_matrix(n, lambda: random.randrange(modulus))
+            timings.append(best_time(lambda: matmul.multiply_mode(mod_a, mod_b, 'mod', modulus), args.repeat))
+        print(f"{n:>6} " + ' '.join(f"{t:>11.3f}" for t in timings))
+
+    np = matmul.np
+    if np is None or not args.workers:
+        return
+    print()
+    print(f"{'n':>6} {'dtype':>8} " + ' '.join(f"{f'{w} proc':>10}" for w in args.workers))
+    for w in args.workers:
+        if w > 1:
+            parallel.parallel_multiply(np.ones((w, 1)), np.ones((1, 1)), workers=w)  # start the pool
+    for n in args.sizes:
+        if n < 500:
+            continue
+        for dtype in (np.int64, np.float64):
+            a = np.random.randint(-1000, 1000, size=(n, n)).astype(dtype)
+            b = np.random.randint(-1000, 1000, size=(n, n)).astype(dtype)
+            cells = [best_time(lambda: parallel.parallel_multiply(a, b, workers=w), args.repeat) if w > 1
+                     else best_time(lambda: a @ b, args.repeat) for w in args.workers]
+            print(f"{n:>6} {np.dtype(dtype).name:>8} " + ' '.join(f"{t:>10.1f}" for t in cells))
+
+if __name__ == '__main__':
+    run()
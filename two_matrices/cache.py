@@ -0,0 +1,138 @@
+"""Content-addressed cache of encoded matrix products.
+
+Keys are BLAKE2b digests of the canonical input bytes (the binary request
+body, or compact JSON of both matrices), so resubmitting the same A and B
+is served without recomputing. Values are the encoded product, ready to
+send.
+
+Two tiers:
+* memory  per worker, an LRU bounded by total bytes
+* disk    optional (MATMUL_CACHE_DIR), shared by all workers, least
+          recently used files deleted past its own byte budget; disk hits
+          are promoted to memory
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+CACHE_CONFIG = {
+    'max_bytes': int(os.environ.get('MATMUL_CACHE_BYTES', 64 * 1024 * 1024)),
+    'max_item_bytes': int(os.environ.get('MATMUL_CACHE_ITEM_BYTES', 16 * 1024 * 1024)),
+    'directory': os.environ.get('MATMUL_CACHE_DIR') or None,
+    'disk_max_bytes': int(os.environ.get('MATMUL_CACHE_DISK_BYTES', 1024 * 1024 * 1024)),
+}
+
+SUFFIX = '.bin'
+
+def cache_key(*parts):
+    """Hex digest of byte strings, length-prefixed so part boundaries count"""
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+class ResultCache:
+    def __init__(self, max_bytes, max_item_bytes, directory, disk_max_bytes):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes, max_bytes)
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self.entries = OrderedDict()  # key -> bytes
+        self.size = 0
+        self.lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def _remember(self, key, value):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, old = self.entries.popitem(last=False)
+                self.size -= len(old)
+                self.counters['evictions'] += 1
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return value
+        if self.directory:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    value = f.read()
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                value = None
+            if value is not None:
+                with self.lock:
+                    self.counters['disk_hits'] += 1
+                if len(value) <= self.max_item_bytes:
+                    self._remember(key, value)
+                return value
+        with self.lock:
+            self.counters['misses'] += 1
+        return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.counters['stores'] += 1
+        if len(value) <= self.max_item_bytes:
+            self._remember(key, value)
+        if self.directory and len(value) <= self.disk_max_bytes:
+            # Write under a temporary name so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(value)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+                return  # the disk tier is best effort
+            self._evict_disk(keep=self._path(key))
+
+    def _evict_disk(self, keep=None):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            if path == keep:  # the file just written always stays
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters, entries=len(self.entries), bytes=self.size, max_bytes=self.max_bytes,
+                         disk=bool(self.directory))
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+result_cache = ResultCache(**CACHE_CONFIG)
@@ -1,4 +1,13 @@
-from flask import Flask, request, render_template_string
+import json
+import os
+import struct
+import sys
+from array import array
+from flask import Flask, request, render_template_string, jsonify, Response
+from cache import cache_key, result_cache
+from matmul import (MODES, check_mode, multiply_mode, multiply_arrays_mode, multiply_batch, multiply_chain,
+                    chain_cost_left_to_right, check_shapes, shape, np)
+from sparse import CSRMatrix, multiply_csr, multiply_csr_dense
 app = Flask(__name__)
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -73,6 +82,22 @@ HTML_TEMPLATE = '''
             box-shadow: 0 8px 24px rgba(0, 0, 0, 0.1);
         }
 
+        .mode-selector {
+            text-align: center;
+            margin-top: 20px;
+            color: #4a5568;
+            font-weight: 600;
+        }
+
+        .mode-selector select,
+        .mode-selector input {
+            margin: 0 10px;
+            padding: 6px 10px;
+            border: 2px solid #e2e8f0;
+            border-radius: 8px;
+            background: rgba(255, 255, 255, 0.9);
+        }
+
         .size-selector label {
             font-size: 1.2em;
             font-weight: 600;
@@ -329,6 +354,33 @@ HTML_TEMPLATE = '''
             }
         }
 
+        .paste-form {
+            margin-top: 30px;
+            text-align: center;
+        }
+
+        .paste-form summary {
+            cursor: pointer;
+            font-weight: 600;
+            color: #4a5568;
+            margin-bottom: 15px;
+        }
+
+        textarea {
+            width: 260px;
+            height: 160px;
+            padding: 10px;
+            border: 2px solid #e2e8f0;
+            border-radius: 8px;
+            font-family: monospace;
+            background: rgba(255, 255, 255, 0.9);
+        }
+
+        textarea:focus {
+            outline: none;
+            border-color: #667eea;
+        }
+
         .matrix-row {
             display: flex;
             justify-content: center;
@@ -382,6 +434,20 @@ HTML_TEMPLATE = '''
     </style>
 </head>
 <body>
+    {% macro mode_fields() %}
+        <div class="mode-selector">
+            <label>Arithmetic:
+                <select name="mode">
+                    {% for name in modes %}
+                        <option value="{{ name }}" {% if name == mode %}selected{% endif %}>{{ name }}</option>
+                    {% endfor %}
+                </select>
+            </label>
+            <label>Modulus (mod):
+                <input type="text" name="modulus" value="{{ modulus }}" size="12">
+            </label>
+        </div>
+    {% endmacro %}
     <div class="container">
         <h2>n×n Matrix Multiplication</h2>
         
@@ -406,10 +472,10 @@ HTML_TEMPLATE = '''
             <div class="matrices-container">
                 <div class="matrix">
                     <h4>Matrix A ({{ size }}×{{ size }})</h4>
-                    {% for i in range(size) %}
+                    {% for row in cells_a %}
                         <div class="matrix-row">
-                            {% for j in range(size) %}
-                                <input type="number" name="a{{ i }}{{ j }}" value="{{ matrix_a[i][j] if matrix_a and i < matrix_a|length and j < matrix_a[i]|length else '' }}" required>
+                            {% for value in row %}
+                                <input type="number" name="a" value="{{ value }}" required>
                             {% endfor %}
                         </div>
                     {% endfor %}
@@ -419,17 +485,31 @@ HTML_TEMPLATE = '''
                 
                 <div class="matrix">
                     <h4>Matrix B ({{ size }}×{{ size }})</h4>
-                    {% for i in range(size) %}
+                    {% for row in cells_b %}
                         <div class="matrix-row">
-                            {% for j in range(size) %}
-                                <input type="number" name="b{{ i }}{{ j }}" value="{{ matrix_b[i][j] if matrix_b and i < matrix_b|length and j < matrix_b[i]|length else '' }}" required>
+                            {% for value in row %}
+                                <input type="number" name="b" value="{{ value }}" required>
                             {% endfor %}
                         </div>
                     {% endfor %}
                 </div>
             </div>
+            {{ mode_fields() }}
             <input type="submit" value="Multiply Matrices">
         </form>
+
+        <details class="paste-form">
+            <summary>Paste larger matrices (up to {{ max_size }}×{{ max_size }})</summary>
+            <form method="post">
+                <div class="matrices-container">
+                    <textarea name="a_text" placeholder="Matrix A: one row per line, numbers separated by spaces or commas" required></textarea>
+                    <div class="multiply-symbol">×</div>
+                    <textarea name="b_text" placeholder="Matrix B: one row per line, numbers separated by spaces or commas" required></textarea>
+                </div>
+                {{ mode_fields() }}
+                <input type="submit" value="Multiply Pasted Matrices">
+            </form>
+        </details>
         
         {% if result %}
             <h3>Result:</h3>
@@ -453,6 +533,52 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
+# Largest n×n accepted from the form; the size selector offers up to 10×10,
+# larger matrices are pasted as text
+FORM_MAX_SIZE = int(os.environ.get('FORM_MAX_SIZE', 100))
+
+def form_cells(name, size):
+    """(size, cell strings in row order, values per row) of matrix `name` in the posted form
+
+    The grid posts its cells as repeated `name` fields, read with one
+    getlist call (values per row is then None, the grid fixes the layout);
+    a pasted `name_text` field takes precedence and sets the size to its
+    number of lines.
+    """
+    text = request.form.get(f'{name}_text', '')
+    if text.strip():
+        rows = [line.replace(',', ' ').split() for line in text.splitlines() if line.strip()]
+        return len(rows), [cell for row in rows for cell in row], [len(row) for row in rows]
+    return size, request.form.getlist(name), None
+
+def parse_cells(cells, size, label, row_lengths=None):
+    """Parse all cells in one pass into a contiguous buffer and return it as rows
+
+    row_lengths, the number of values on each pasted line, must all equal
+    size; pasted rows are never reflowed into a different shape.
+    """
+    for i, length in enumerate(row_lengths or ()):
+        if length < size:
+            raise ValueError(f"Missing values in row {i + 1} of Matrix {label}")
+        if length > size:
+            raise ValueError(f"Too many values in row {i + 1} of Matrix {label}")
+    if len(cells) != size * size:
+        raise ValueError(f"Matrix {label} must have {size}×{size} values")
+    if '' in cells:
+        raise ValueError(f"Missing values in Matrix {label}")
+    try:
+        values = array('q', map(int, cells))
+        return [values[i:i + size].tolist() for i in range(0, size * size, size)]
+    except OverflowError:  # beyond int64: keep Python ints
+        values = list(map(int, cells))
+        return [values[i:i + size] for i in range(0, size * size, size)]
+
+def grid(cells, size):
+    """Cell strings as size rows of size values for the template, padded with blanks"""
+    cells = cells[:size * size]
+    cells += [''] * (size * size - len(cells))
+    return [cells[i:i + size] for i in range(0, size * size, size)]
+
 @app.route('/', methods=['GET', 'POST'])
 def multiply_matrices():
     size = int(request.args.get('size', 2))  # Default to 2x2
@@ -461,40 +587,24 @@ def multiply_matrices():
     
     result = None
     error = None
-    matrix_a = None
-    matrix_b = None
+    cells_a = cells_b = []
+    mode = request.form.get('mode', 'auto')
+    modulus = request.form.get('modulus', '').strip()
     
     if request.method == 'POST':
         size = int(request.form.get('size', 2))
+        size_a, cells_a, lengths_a = form_cells('a', size)
+        size_b, cells_b, lengths_b = form_cells('b', size)
+        size = min(max(size_a, size_b, 1), FORM_MAX_SIZE)
         try:
-            # Read Matrix A
-            matrix_a = []
-            for i in range(size):
-                row = []
-                for j in range(size):
-                    val = request.form.get(f'a{i}{j}')
-                    if val is None or val == '':
-                        raise ValueError("Missing values in Matrix A")
-                    row.append(int(val))
-                matrix_a.append(row)
-            
-            # Read Matrix B
-            matrix_b = []
-            for i in range(size):
-                row = []
-                for j in range(size):
-                    val = request.form.get(f'b{i}{j}')
-                    if val is None or val == '':
-                        raise ValueError("Missing values in Matrix B")
-                    row.append(int(val))
-                matrix_b.append(row)
-            
-            # Matrix multiplication logic
-            result = [[0 for _ in range(size)] for _ in range(size)]
-            for i in range(size):
-                for j in range(size):
-                    for k in range(size):
-                        result[i][j] += matrix_a[i][k] * matrix_b[k][j]
+            if max(size_a, size_b) > FORM_MAX_SIZE:
+                raise ValueError(f"Matrices are limited to {FORM_MAX_SIZE}×{FORM_MAX_SIZE}")
+            if size_a != size_b:
+                raise ValueError(f"Matrix A has {size_a} rows but Matrix B has {size_b}")
+            matrix_a = parse_cells(cells_a, size, 'A', lengths_a)
+            matrix_b = parse_cells(cells_b, size, 'B', lengths_b)
+            result = json.loads(cached_product_json(matrix_a, matrix_b, mode,
+                                                    int(modulus) if mode == 'mod' and modulus else None))
                         
         except ValueError as e:
             error = f"Error: {str(e)}. Please enter valid numbers in all fields."
@@ -505,8 +615,285 @@ def multiply_matrices():
                                 result=result, 
                                 size=size, 
                                 error=error,
-                                matrix_a=matrix_a,
-                                matrix_b=matrix_b)
+                                cells_a=grid(cells_a, size),
+                                cells_b=grid(cells_b, size),
+                                max_size=FORM_MAX_SIZE,
+                                modes=MODES,
+                                mode=mode,
+                                modulus=modulus)
+
+# Largest number of rows or columns accepted by /api/multiply
+MAX_DIM = int(os.environ.get('MATRIX_MAX_DIM', 4096))
+
+# Binary matrices: a 12-byte header (dtype code b'q' for int64 or b'd' for
+# float64, 3 padding bytes, uint32 rows, uint32 columns), then the values
+# row by row, all little-endian
+FRAME_HEADER = struct.Struct('<cxxxII')
+FRAME_TYPES = {b'q': 'int64', b'd': 'float64'}
+
+def read_frames(body, count):
+    """Split a binary body into `count` matrices (NumPy arrays, or lists of rows without NumPy)"""
+    matrices = []
+    offset = 0
+    for _ in range(count):
+        if len(body) < offset + FRAME_HEADER.size:
+            raise ValueError("Truncated matrix header")
+        code, rows, cols = FRAME_HEADER.unpack_from(body, offset)
+        if code not in FRAME_TYPES:
+            raise ValueError("Matrix dtype code must be b'q' (int64) or b'd' (float64)")
+        if not 1 <= rows <= MAX_DIM or not 1 <= cols <= MAX_DIM:
+            raise ValueError(f"Matrix dimensions must be between 1 and {MAX_DIM}")
+        offset += FRAME_HEADER.size
+        end = offset + rows * cols * 8
+        if len(body) < end:
+            raise ValueError("Truncated matrix data")
+        if np is not None:
+            values = np.frombuffer(body, dtype='<' + code.decode(), count=rows * cols, offset=offset)
+            matrices.append(values.reshape(rows, cols))
+        else:
+            values = array(code.decode())
+            values.frombytes(body[offset:end])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            matrices.append([values[i * cols:(i + 1) * cols].tolist() for i in range(rows)])
+        offset = end
+    if offset != len(body):
+        raise ValueError("Unexpected bytes after the matrices")
+    return matrices
+
+def write_frame(matrix):
+    """Encode a NumPy array or list of rows as a binary matrix"""
+    if np is not None and isinstance(matrix, np.ndarray):
+        code = b'd' if matrix.dtype.kind == 'f' else b'q'
+        rows, cols = matrix.shape
+        data = matrix.astype('<' + code.decode(), copy=False).tobytes()
+    else:
+        rows, cols = len(matrix), len(matrix[0])
+        code = b'd' if any(type(x) is float for row in matrix for x in row) else b'q'
+        values = array(code.decode(), [x for row in matrix for x in row])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        data = values.tobytes()
+    return FRAME_HEADER.pack(code, rows, cols) + data
+
+def request_mode(data):
+    """(mode, modulus) from a JSON body's "mode" and "modulus", else from the query string
+
+    Raises ValueError for an unknown mode or a missing or bad modulus.
+    """
+    if isinstance(data, dict) and 'mode' in data:
+        mode, modulus = data['mode'], data.get('modulus')
+    else:
+        mode, modulus = request.args.get('mode', 'auto'), request.args.get('modulus')
+        if modulus is not None:
+            try:
+                modulus = int(modulus)
+            except ValueError:
+                raise ValueError("The modulus must be an integer")
+    check_mode(mode, modulus)
+    return mode, modulus
+
+def cached_product_json(a, b, mode='auto', modulus=None):
+    """Compact JSON of a × b, from the result cache when the same pair was seen before"""
+    key = cache_key(b'json', json.dumps([a, b], separators=(',', ':')).encode('utf-8'),
+                    f'{mode}:{modulus}'.encode('ascii'))
+    encoded = result_cache.get(key)
+    if encoded is None:
+        encoded = json.dumps(multiply_mode(a, b, mode, modulus), separators=(',', ':')).encode('utf-8')
+        result_cache.put(key, encoded)
+    return encoded
+
+def is_number_matrix(matrix):
+    return (isinstance(matrix, list) and all(isinstance(row, list) for row in matrix)
+            and all(type(x) in (int, float) for row in matrix for x in row))
+
+@app.route('/api/multiply', methods=['POST'])
+def api_multiply():
+    """Multiply an m×k matrix A by a k×n matrix B
+
+    JSON {"a": [[...], ...], "b": [[...], ...]} gets {"shape": [m, n],
+    "result": [[...], ...]}. Either matrix may instead be sparse, in COO or
+    CSR form (see sparse.py); the result is then CSR if both are sparse and
+    rows of numbers otherwise. An application/octet-stream body holds A then B
+    as binary matrices (see FRAME_HEADER) and gets the product back in the
+    same format. Repeated inputs are answered from the result cache.
+
+    "mode" (query argument for binary bodies) picks the arithmetic: auto,
+    int64, float64, exact or mod with an integer "modulus" (see
+    matmul.multiply_mode). int64 answers 422 when the product would
+    overflow; exact needs JSON since its entries have no fixed width.
+    """
+    if request.mimetype == 'application/octet-stream':
+        try:
+            mode, modulus = request_mode(None)
+            if mode == 'exact':
+                raise ValueError("Binary results are int64 or float64; use JSON for the exact mode")
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        body = request.get_data()
+        key = cache_key(b'frames', body, f'{mode}:{modulus}'.encode('ascii'))
+        cached = result_cache.get(key)
+        if cached is not None:
+            return Response(cached, mimetype='application/octet-stream')
+        try:
+            a, b = read_frames(body, 2)
+            if np is not None:
+                product = multiply_arrays_mode(a, b, mode, modulus)
+            else:
+                product = multiply_mode(a, b, mode, modulus)
+                if any(type(x) is int and not -2 ** 63 <= x < 2 ** 63 for row in product for x in row):
+                    raise OverflowError("The product does not fit in int64")
+        except OverflowError as e:
+            return jsonify({'error': f"{e}; send float64 matrices or use JSON for exact results"}), 422
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        payload = write_frame(product)
+        result_cache.put(key, payload)
+        return Response(payload, mimetype='application/octet-stream')
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and (isinstance(data.get('a'), dict) or isinstance(data.get('b'), dict)):
+        return multiply_sparse(data)
+    if not isinstance(data, dict) or not is_number_matrix(data.get('a')) or not is_number_matrix(data.get('b')):
+        return jsonify({'error': 'Expected a JSON object with "a" and "b", each a list of rows of numbers '
+                                 'or a sparse matrix'}), 400
+    a, b = data['a'], data['b']
+    try:
+        mode, modulus = request_mode(data)
+        m, k, n = check_shapes(a, b)
+        if max(m, k, n) > MAX_DIM:
+            raise ValueError(f"Matrix dimensions must be between 1 and {MAX_DIM}")
+        result = cached_product_json(a, b, mode, modulus)
+    except OverflowError as e:
+        return jsonify({'error': f"{e}; use the exact or auto mode"}), 422
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(b'{"shape":[%d,%d],"result":%s}' % (m, n, result), mimetype='application/json')
+
+# Most pairs accepted by one batch request
+MAX_BATCH = int(os.environ.get('MATRIX_MAX_BATCH', 1000))
+# Chains are planned with an O(n^3) pure-Python DP, so they get a lower limit
+MAX_CHAIN = int(os.environ.get('MATRIX_MAX_CHAIN', 64))
+
+def check_dims(*matrices):
+    for matrix in matrices:
+        if len(matrix) > MAX_DIM or (matrix and len(matrix[0]) > MAX_DIM):
+            raise ValueError(f"Matrix dimensions must be between 1 and {MAX_DIM}")
+
+# Most nonzeros accepted per sparse matrix and sparse product
+MAX_NNZ = int(os.environ.get('MATRIX_MAX_NNZ', 1000000))
+
+def parse_sparse(matrix):
+    """CSRMatrix from the sparse JSON form, or None for rows of numbers"""
+    if not isinstance(matrix, dict):
+        if not is_number_matrix(matrix):
+            raise ValueError("Each matrix must be a list of rows of numbers or a sparse matrix")
+        return None
+    return CSRMatrix.from_json(matrix, max_dim=MAX_DIM, max_nnz=MAX_NNZ)
+
+def multiply_sparse(data):
+    """/api/multiply with at least one sparse operand"""
+    try:
+        if request_mode(data)[0] != 'auto':
+            raise ValueError("Sparse matrices are only multiplied in the auto mode")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    key = cache_key(b'sparse', request.get_data())
+    cached = result_cache.get(key)
+    if cached is not None:
+        return Response(cached, mimetype='application/json')
+    a, b = data['a'], data['b']
+    try:
+        sparse_a, sparse_b = parse_sparse(a), parse_sparse(b)
+        if sparse_a is not None and sparse_b is not None:
+            result = multiply_csr(sparse_a, sparse_b, max_nnz=MAX_NNZ)
+            result_shape, encoded = result.shape, result.to_json()
+        else:
+            # The dense operand bounds the inner dimension; the result is dense
+            dense = a if sparse_a is None else b
+            shape(dense)
+            check_dims(dense)
+            sparse_a = sparse_a or CSRMatrix.from_dense(a)
+            rows, cols = sparse_a.shape[0], sparse_b.shape[1] if sparse_b is not None else len(b[0])
+            if max(rows, cols) > MAX_DIM:
+                raise ValueError(f"Results with a dense operand are limited to {MAX_DIM}×{MAX_DIM}")
+            inner = sparse_b.shape[0] if sparse_b is not None else len(b)
+            if inner != sparse_a.shape[1]:
+                raise ValueError(f"Cannot multiply {rows}×{sparse_a.shape[1]} by {inner}×{cols}: "
+                                 "inner dimensions differ")
+            if sparse_b is not None:
+                b = sparse_b.to_dense()
+            result_shape, encoded = (rows, cols), multiply_csr_dense(sparse_a, b)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    payload = json.dumps({'shape': list(result_shape), 'result': encoded}, separators=(',', ':')).encode('utf-8')
+    result_cache.put(key, payload)
+    return Response(payload, mimetype='application/json')
+
+@app.route('/api/multiply/batch', methods=['POST'])
+def api_multiply_batch():
+    """Many independent products: JSON {"pairs": [{"a": ..., "b": ...}, ...]}
+
+    Answers {"results": [{"shape": [m, n], "result": ...}, ...]} in order.
+    Pairs of equal shapes are computed together as one stacked 3-D product.
+    "mode" and "modulus" apply to every pair, as for /api/multiply.
+    """
+    data = request.get_json(silent=True)
+    pairs = data.get('pairs') if isinstance(data, dict) else None
+    if not isinstance(pairs, list) or not pairs or not all(
+            isinstance(pair, dict) and is_number_matrix(pair.get('a')) and is_number_matrix(pair.get('b'))
+            for pair in pairs):
+        return jsonify({'error': 'Expected a JSON object with "pairs", a non-empty list of {"a": ..., "b": ...}'}), 400
+    if len(pairs) > MAX_BATCH:
+        return jsonify({'error': f'At most {MAX_BATCH} pairs per request'}), 400
+    try:
+        mode, modulus = request_mode(data)
+        for pair in pairs:
+            check_dims(pair['a'], pair['b'])
+        results = multiply_batch([(pair['a'], pair['b']) for pair in pairs], mode, modulus)
+    except OverflowError as e:
+        return jsonify({'error': f"{e}; use the exact or auto mode"}), 422
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'results': [{'shape': [len(r), len(r[0])], 'result': r} for r in results]})
+
+@app.route('/api/multiply/chain', methods=['POST'])
+def api_multiply_chain():
+    """A1 × A2 × ... × An: JSON {"matrices": [A1, A2, ...]}
+
+    The product is evaluated in the order that needs the fewest scalar
+    multiplications (matrix-chain DP). The answer reports that order, its
+    cost, and the savings over plain left-to-right evaluation. "mode" and
+    "modulus" work as for /api/multiply.
+    """
+    data = request.get_json(silent=True)
+    matrices = data.get('matrices') if isinstance(data, dict) else None
+    if not isinstance(matrices, list) or not matrices or not all(is_number_matrix(m) for m in matrices):
+        return jsonify({'error': 'Expected a JSON object with "matrices", a non-empty list of matrices'}), 400
+    if len(matrices) > MAX_CHAIN:
+        return jsonify({'error': f'At most {MAX_CHAIN} matrices per chain'}), 400
+    try:
+        mode, modulus = request_mode(data)
+        check_dims(*matrices)
+        result, flops, order = multiply_chain(matrices, mode, modulus)
+    except OverflowError as e:
+        return jsonify({'error': f"{e}; use the exact or auto mode"}), 422
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    dims = [len(matrices[0])] + [len(m[0]) for m in matrices]
+    naive_flops = chain_cost_left_to_right(dims)
+    return jsonify({
+        'shape': [len(result), len(result[0])],
+        'result': result,
+        'order': order,
+        'flops': flops,
+        'flops_left_to_right': naive_flops,
+        'flops_saved': naive_flops - flops,
+    })
+
+@app.route('/health')
+def health_check():
+    return {"status": "healthy", "result_cache": result_cache.stats()}, 200
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8080)   
@@ -0,0 +1,466 @@
+"""Matrix multiplication backends for the two_matrices app.
+
+multiply(a, b) takes lists of row lists and picks a backend:
+
+* numpy   int64 when every product fits (checked up front, so results never
+          wrap around silently), float64 through BLAS when any entry is a float
+* python  pure-Python kernels, exact for integers of any size, used for tiny
+          inputs, big integers or without NumPy: rows times transposed
+          columns with zip/sum, a cache-tiled variant for larger operands
+          and Strassen above STRASSEN_MIN_SIZE
+
+Mostly-zero inputs are first offered to the sparse kernels (sparse.py).
+Set MATMUL_BACKEND to force one of them.
+
+multiply_mode(a, b, mode) fixes the arithmetic per request instead (see
+MODES): int64 that fails on overflow, float64, exact big integers, or
+residues mod p.
+"""
+import os
+from operator import add, mul, sub
+
+import parallel
+import sparse
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure-Python backend covers everything
+    np = None
+
+INT64_MAX = 2 ** 63 - 1
+# Below this many multiply-adds, converting to NumPy arrays costs more than it saves
+NUMPY_MIN_OPS = 512
+# Pure-Python kernels; crossovers measured with benchmark.py --kernels
+TILE_SIZE = 64
+TILED_MIN_ELEMENTS = 128 * 128  # size of B at which tiling starts to pay off
+STRASSEN_MIN_SIZE = 256  # smallest dimension at which Strassen is used
+STRASSEN_CROSSOVER = 128  # recursion switches to the tiled kernel below this
+
+def shape(matrix):
+    """(rows, columns) of a list of equal-length rows; raises ValueError if ragged"""
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+    if not rows or not cols:
+        raise ValueError("Matrices must not be empty")
+    if any(len(row) != cols for row in matrix):
+        raise ValueError("All rows of a matrix must have the same length")
+    return rows, cols
+
+def check_shapes(a, b):
+    """Validate a × b and return (m, k, n)"""
+    m, k = shape(a)
+    k2, n = shape(b)
+    if k != k2:
+        raise ValueError(f"Cannot multiply {m}×{k} by {k2}×{n}: inner dimensions differ")
+    return m, k, n
+
+def multiply_rows(a, b):
+    """Rows of a times columns of b, with the inner loop in zip/sum"""
+    columns = list(zip(*b))
+    return [[sum(map(mul, row, column)) for column in columns] for row in a]
+
+def multiply_tiled(a, b, tile=TILE_SIZE):
+    """multiply_rows over tile-sized blocks of columns and of the inner dimension
+
+    Each block of columns is reused for every row while it is still in cache,
+    and long rows are split so a row chunk and a column chunk fit together.
+    """
+    k = len(b)
+    columns = list(zip(*b))
+    result = [[0] * len(columns) for _ in a]
+    for k0 in range(0, k, tile):
+        row_chunks = [row[k0:k0 + tile] for row in a]
+        for j0 in range(0, len(columns), tile):
+            block = [column[k0:k0 + tile] for column in columns[j0:j0 + tile]]
+            for out, chunk in zip(result, row_chunks):
+                out[j0:j0 + len(block)] = [
+                    acc + sum(map(mul, chunk, column)) for acc, column in zip(out[j0:j0 + len(block)], block)
+                ]
+    return result
+
+def _add(x, y):
+    return [list(map(add, rx, ry)) for rx, ry in zip(x, y)]
+
+def _sub(x, y):
+    return [list(map(sub, rx, ry)) for rx, ry in zip(x, y)]
+
+def _pad(matrix, rows, cols):
+    """matrix grown with zero rows/columns to rows × cols"""
+    extra = cols - len(matrix[0])
+    padded = [row + [0] * extra for row in matrix] if extra else [row[:] for row in matrix]
+    padded.extend([0] * cols for _ in range(rows - len(matrix)))
+    return padded
+
+def multiply_strassen(a, b, crossover=STRASSEN_CROSSOVER):
+    """Strassen's algorithm: 7 half-size products per level instead of 8
+
+    Odd dimensions are padded with a zero row or column. Levels stop once any
+    dimension is below `crossover`, where multiply_tiled takes over.
+    """
+    m, k, n = len(a), len(b), len(b[0])
+    if min(m, k, n) < max(2, crossover):
+        return multiply_tiled(a, b)
+    m2, k2, n2 = (m + 1) // 2, (k + 1) // 2, (n + 1) // 2
+    if (m, k) != (2 * m2, 2 * k2):
+        a = _pad(a, 2 * m2, 2 * k2)
+    if (k, n) != (2 * k2, 2 * n2):
+        b = _pad(b, 2 * k2, 2 * n2)
+
+    a11 = [row[:k2] for row in a[:m2]]
+    a12 = [row[k2:] for row in a[:m2]]
+    a21 = [row[:k2] for row in a[m2:]]
+    a22 = [row[k2:] for row in a[m2:]]
+    b11 = [row[:n2] for row in b[:k2]]
+    b12 = [row[n2:] for row in b[:k2]]
+    b21 = [row[:n2] for row in b[k2:]]
+    b22 = [row[n2:] for row in b[k2:]]
+
+    p1 = multiply_strassen(_add(a11, a22), _add(b11, b22), crossover)
+    p2 = multiply_strassen(_add(a21, a22), b11, crossover)
+    p3 = multiply_strassen(a11, _sub(b12, b22), crossover)
+    p4 = multiply_strassen(a22, _sub(b21, b11), crossover)
+    p5 = multiply_strassen(_add(a11, a12), b22, crossover)
+    p6 = multiply_strassen(_sub(a21, a11), _add(b11, b12), crossover)
+    p7 = multiply_strassen(_sub(a12, a22), _add(b21, b22), crossover)
+
+    c11 = _add(_sub(_add(p1, p4), p5), p7)
+    c12 = _add(p3, p5)
+    c21 = _add(p2, p4)
+    c22 = _add(_add(_sub(p1, p2), p3), p6)
+    top = [r1 + r2 for r1, r2 in zip(c11, c12)]
+    bottom = [r1 + r2 for r1, r2 in zip(c21, c22)]
+    return [row[:n] for row in (top + bottom)[:m]]
+
+def multiply_python(a, b):
+    """Pure-Python product, choosing the kernel by dimensions
+
+    Strassen for large integer matrices (it is exact there, unlike with
+    floats), the tiled kernel once the operands outgrow the cache, and
+    multiply_rows otherwise.
+    """
+    m, k, n = len(a), len(b), len(b[0])
+    if min(m, k, n) >= STRASSEN_MIN_SIZE and not (_is_float(a) or _is_float(b)):
+        return multiply_strassen(a, b)
+    if k * n >= TILED_MIN_ELEMENTS:
+        return multiply_tiled(a, b)
+    return multiply_rows(a, b)
+
+def _is_float(matrix):
+    return any(type(x) is float for row in matrix for x in row)
+
+def _fits_int64(arr_a, arr_b):
+    """True if no entry of arr_a @ arr_b (or any partial sum) can leave int64
+
+    Works for stacked (3-D) batches too.
+    """
+    k = arr_a.shape[-1]
+    # Every term a[i, l] * b[l, j] lies between the extreme corner products,
+    # so a sum of up to k terms lies within k times those (as Python ints)
+    lo_a, hi_a = int(arr_a.min()), int(arr_a.max())
+    lo_b, hi_b = int(arr_b.min()), int(arr_b.max())
+    corners = (lo_a * lo_b, lo_a * hi_b, hi_a * lo_b, hi_a * hi_b)
+    if k * max(max(corners), 0) <= INT64_MAX and k * min(min(corners), 0) >= -INT64_MAX - 1:
+        return True
+    # The entry-wise bound |A| @ |B| bounds every partial sum too; float64 is
+    # accurate enough here with a factor-of-two margin. This bound is
+    # conservative: it may reject a product that would just fit
+    bound = np.abs(arr_a.astype(np.float64)) @ np.abs(arr_b.astype(np.float64))
+    return float(bound.max()) < 2.0 ** 62
+
+def multiply_numpy(a, b):
+    """NumPy product as lists; None if integer inputs or results do not fit in int64"""
+    dtype = np.float64 if _is_float(a) or _is_float(b) else np.int64
+    try:
+        return multiply_arrays(np.array(a, dtype=dtype), np.array(b, dtype=dtype)).tolist()
+    except OverflowError:
+        return None
+
+def multiply_arrays(a, b):
+    """Product of two NumPy arrays, int64 if both are integer, else float64
+
+    Raises OverflowError if an int64 result could wrap around. Large
+    integer products are split across processes (see parallel.py).
+    """
+    if a.shape[1] != b.shape[0]:
+        raise ValueError(f"Cannot multiply {a.shape[0]}×{a.shape[1]} by {b.shape[0]}×{b.shape[1]}: "
+                         "inner dimensions differ")
+    if a.dtype.kind == 'f' or b.dtype.kind == 'f':
+        # BLAS already spreads float products over the cores
+        return a.astype(np.float64, copy=False) @ b.astype(np.float64, copy=False)
+    if not _fits_int64(a, b):
+        raise OverflowError("The product does not fit in int64")
+    a, b = a.astype(np.int64, copy=False), b.astype(np.int64, copy=False)
+    if a.shape[0] * a.shape[1] * b.shape[1] >= parallel.PARALLEL_CONFIG['min_ops']:
+        result = parallel.parallel_multiply(a, b)
+        if result is not None:
+            return result
+    return a @ b
+
+BACKENDS = {
+    'numpy': multiply_numpy,
+    'python': multiply_python,
+}
+
+def multiply(a, b, backend=None):
+    """Return a × b as a list of row lists
+
+    backend is 'numpy', 'python' or None to choose by size and contents
+    (also settable through MATMUL_BACKEND). Integer inputs always give exact
+    integer results.
+    """
+    m, k, n = check_shapes(a, b)
+    backend = backend or os.environ.get('MATMUL_BACKEND')
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}")
+    if backend is None:
+        result = sparse.multiply_auto(a, b)
+        if result is not None:
+            return result
+    if backend == 'python' or np is None or (backend is None and m * k * n < NUMPY_MIN_OPS):
+        return multiply_python(a, b)
+    result = multiply_numpy(a, b)
+    if result is None:  # would overflow int64: stay exact
+        result = multiply_python(a, b)
+    return result
+
+# Numeric modes, see multiply_mode
+MODES = ('auto', 'int64', 'float64', 'exact', 'mod')
+# float64 represents every integer below 2**53 exactly
+FLOAT_EXACT_BITS = 53
+# Modular products cut the inner dimension into chunks at least this long
+# (or all of it) so each BLAS call stays big enough to be efficient
+MOD_MIN_CHUNK = 256
+
+def _is_integer(matrix):
+    return all(type(x) is int for row in matrix for x in row)
+
+def _mod_plan(bits, k):
+    """(limb width, chunk length) making float64 products of residues exact, or None
+
+    Entries of A are split into limbs of `width` bits, so a limb times a
+    residue of B has bits + width bits, and sums of `chunk` of them stay
+    below 2**53. Fewer limbs mean fewer BLAS calls, but each call must
+    still cover min(k, MOD_MIN_CHUNK) terms.
+    """
+    for limbs in range(1, bits + 1):
+        width = -(-bits // limbs)
+        headroom = FLOAT_EXACT_BITS - bits - width
+        if headroom >= 0 and 1 << headroom >= min(k, MOD_MIN_CHUNK):
+            return width, min(k, 1 << headroom)
+    return None
+
+def multiply_mod_arrays(a, b, modulus):
+    """(a @ b) % modulus for int64 arrays of residues in [0, modulus), or None if modulus is too big
+
+    Runs on BLAS: A is split into limbs and the inner dimension into chunks
+    (see _mod_plan) so that every float64 product is exact; partial
+    products are reduced as int64 and recombined with Horner's rule. Works
+    on stacked (3-D) batches too.
+    """
+    bits = (modulus - 1).bit_length()
+    k = a.shape[-1]
+    plan = _mod_plan(bits, k)
+    if plan is None:
+        return None
+    width, chunk = plan
+    fb = b.astype(np.float64)
+    result = None
+    for shift in range((bits - 1) // width * width, -1, -width):
+        limb = ((a >> shift) & ((1 << width) - 1)).astype(np.float64)
+        part = None
+        for start in range(0, k, chunk):
+            product = np.matmul(limb[..., start:start + chunk], fb[..., start:start + chunk, :])
+            product = product.astype(np.int64) % modulus
+            part = product if part is None else (part + product) % modulus
+        # result * 2**width stays below 2**(bits + width) <= 2**53
+        result = part if result is None else (result * (1 << width) + part) % modulus
+    return result
+
+def multiply_mod(a, b, modulus):
+    """(a × b) mod modulus for integer matrices, entries in [0, modulus)"""
+    check_shapes(a, b)
+    a = [[x % modulus for x in row] for row in a]
+    b = [[x % modulus for x in row] for row in b]
+    if np is not None and (modulus - 1).bit_length() < FLOAT_EXACT_BITS:
+        result = multiply_mod_arrays(np.array(a, dtype=np.int64), np.array(b, dtype=np.int64), modulus)
+        if result is not None:
+            return result.tolist()
+    # Exact products, reduced once per entry
+    return [[x % modulus for x in row] for row in multiply_python(a, b)]
+
+def check_mode(mode, modulus, *matrices):
+    """Raise ValueError unless mode (and modulus) can be used with these matrices"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+    if mode == 'mod' and (type(modulus) is not int or modulus < 2):
+        raise ValueError("The mod mode needs an integer modulus of at least 2")
+    if mode in ('int64', 'exact', 'mod') and not all(_is_integer(matrix) for matrix in matrices):
+        raise ValueError(f"The {mode} mode needs integer matrices")
+
+def multiply_mode(a, b, mode='auto', modulus=None):
+    """Return a × b as a list of row lists with the arithmetic fixed by mode
+
+    * auto     multiply: int64 or float64 when exact, else big integers
+    * int64    integers only; raises OverflowError instead of falling back
+    * float64  floating point (BLAS), integers are converted
+    * exact    integers only, arbitrary precision (pure Python)
+    * mod      integers only, every entry reduced mod `modulus` (>= 2)
+    """
+    check_mode(mode, modulus, a, b)
+    if mode == 'auto':
+        return multiply(a, b)
+    if mode == 'exact':
+        check_shapes(a, b)
+        return multiply_python(a, b)
+    if mode == 'mod':
+        return multiply_mod(a, b, modulus)
+    if mode == 'float64':
+        check_shapes(a, b)
+        if np is None:
+            return multiply_python([[float(x) for x in row] for row in a], [[float(x) for x in row] for row in b])
+        return multiply_arrays(np.array(a, dtype=np.float64), np.array(b, dtype=np.float64)).tolist()
+    # int64
+    check_shapes(a, b)
+    if any(not -INT64_MAX - 1 <= x <= INT64_MAX for matrix in (a, b) for row in matrix for x in row):
+        raise OverflowError("The matrices do not fit in int64")
+    if np is not None:
+        return multiply_arrays(np.array(a, dtype=np.int64), np.array(b, dtype=np.int64)).tolist()
+    result = multiply_python(a, b)
+    if any(not -INT64_MAX - 1 <= x <= INT64_MAX for row in result for x in row):
+        raise OverflowError("The product does not fit in int64")
+    return result
+
+def multiply_arrays_mode(a, b, mode='auto', modulus=None):
+    """multiply_mode for 2-D NumPy arrays, returning an int64 or float64 array
+
+    The exact mode has no fixed-width result and is rejected, as are moduli
+    whose residues do not fit in int64.
+    """
+    check_mode(mode, modulus)
+    if mode == 'exact':
+        raise ValueError("The exact mode needs lists, its results can exceed int64")
+    if mode in ('int64', 'mod') and (a.dtype.kind == 'f' or b.dtype.kind == 'f'):
+        raise ValueError(f"The {mode} mode needs integer matrices")
+    if mode == 'float64':
+        return multiply_arrays(a.astype(np.float64), b.astype(np.float64))
+    if mode == 'mod':
+        if modulus > INT64_MAX:
+            raise ValueError("The modulus must be below 2**63 for int64 results")
+        if a.shape[1] != b.shape[0]:
+            raise ValueError(f"Cannot multiply {a.shape[0]}×{a.shape[1]} by {b.shape[0]}×{b.shape[1]}: "
+                             "inner dimensions differ")
+        result = multiply_mod_arrays(a % modulus, b % modulus, modulus)
+        if result is None:
+            result = np.array(multiply_mod(a.tolist(), b.tolist(), modulus), dtype=np.int64)
+        return result
+    return multiply_arrays(a, b)
+
+def multiply_batch(pairs, mode='auto', modulus=None):
+    """Products of many independent (a, b) pairs, as a list of row lists each
+
+    Pairs with the same shapes and element type are stacked into 3-D arrays
+    and multiplied in one NumPy call (in the auto, float64 and mod modes);
+    anything NumPy cannot do exactly goes through multiply_mode one pair at
+    a time.
+    """
+    results = [None] * len(pairs)
+    groups = {}
+    for i, (a, b) in enumerate(pairs):
+        m, k, n = check_shapes(a, b)
+        is_float = _is_float(a) or _is_float(b)
+        groups.setdefault((m, k, n, is_float), []).append(i)
+
+    for (m, k, n, is_float), indices in groups.items():
+        stacked = None
+        if np is not None and len(indices) > 1 and mode in ('auto', 'float64', 'mod'):
+            dtype = np.float64 if is_float or mode == 'float64' else np.int64
+            try:
+                if mode == 'mod':
+                    if is_float or type(modulus) is not int or not 2 <= modulus < 2 ** FLOAT_EXACT_BITS:
+                        raise OverflowError  # left to multiply_mode to reject or compute exactly
+                    arr_a = np.array([[[x % modulus for x in row] for row in pairs[i][0]] for i in indices],
+                                     dtype=dtype)
+                    arr_b = np.array([[[x % modulus for x in row] for row in pairs[i][1]] for i in indices],
+                                     dtype=dtype)
+                    stacked = multiply_mod_arrays(arr_a, arr_b, modulus)
+                else:
+                    arr_a = np.array([pairs[i][0] for i in indices], dtype=dtype)
+                    arr_b = np.array([pairs[i][1] for i in indices], dtype=dtype)
+                    if dtype == np.float64 or _fits_int64(arr_a, arr_b):
+                        stacked = np.matmul(arr_a, arr_b)
+                if stacked is not None:
+                    stacked = stacked.tolist()
+            except OverflowError:
+                pass
+        for position, i in enumerate(indices):
+            results[i] = stacked[position] if stacked is not None else multiply_mode(*pairs[i], mode, modulus)
+    return results
+
+def chain_order(dims):
+    """Optimal parenthesization of a matrix chain (classic O(n^3) DP)
+
+    dims[i] × dims[i + 1] is the shape of matrix i. Returns (cost, split)
+    where cost is the fewest scalar multiplications and split[i][j] is where
+    the best plan for matrices i..j divides them.
+    """
+    count = len(dims) - 1
+    cost = [[0] * count for _ in range(count)]
+    split = [[0] * count for _ in range(count)]
+    for length in range(2, count + 1):
+        for i in range(count - length + 1):
+            j = i + length - 1
+            cost[i][j] = None
+            for s in range(i, j):
+                c = cost[i][s] + cost[s + 1][j] + dims[i] * dims[s + 1] * dims[j + 1]
+                if cost[i][j] is None or c < cost[i][j]:
+                    cost[i][j] = c
+                    split[i][j] = s
+    return cost[0][count - 1], split
+
+def chain_cost_left_to_right(dims):
+    """Scalar multiplications for ((A1 A2) A3) ... evaluated in order"""
+    return sum(dims[0] * dims[i] * dims[i + 1] for i in range(1, len(dims) - 1))
+
+def multiply_chain(matrices, mode='auto', modulus=None):
+    """Product of a list of matrices in the cheapest order, in a numeric mode (see multiply_mode)
+
+    Returns (result, cost, order) where order spells out the
+    parenthesization with 1-based names, e.g. "(A1 (A2 A3))".
+    """
+    if not matrices:
+        raise ValueError("The chain must contain at least one matrix")
+    dims = [shape(matrices[0])[0]]
+    for i, matrix in enumerate(matrices):
+        rows, cols = shape(matrix)
+        if rows != dims[-1]:
+            raise ValueError(f"Matrix {i + 1} has {rows} rows but the previous one has {dims[-1]} columns")
+        dims.append(cols)
+    cost, split = chain_order(dims)
+
+    check_mode(mode, modulus, *matrices)
+    if len(matrices) == 1:
+        # Nothing to multiply, but the entries still follow the mode
+        matrix = matrices[0]
+        if mode == 'mod':
+            matrix = [[x % modulus for x in row] for row in matrix]
+        elif mode == 'float64':
+            matrix = [[float(x) for x in row] for row in matrix]
+        elif mode == 'int64' and any(not -INT64_MAX - 1 <= x <= INT64_MAX for row in matrix for x in row):
+            raise OverflowError("The matrix does not fit in int64")
+        return matrix, 0, "A1"
+    # Walk the split tree in post-order with an explicit stack; recursion
+    # depth would grow with the chain length
+    done = {(i, i): (matrix, f"A{i + 1}") for i, matrix in enumerate(matrices)}
+    stack = [(0, len(matrices) - 1)]
+    while stack:
+        i, j = stack[-1]
+        left, right = (i, split[i][j]), (split[i][j] + 1, j)
+        pending = [part for part in (left, right) if part not in done]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        (left_matrix, left_order), (right_matrix, right_order) = done.pop(left), done.pop(right)
+        done[i, j] = multiply_mode(left_matrix, right_matrix, mode, modulus), f"({left_order} {right_order})"
+    result, order = done[0, len(matrices) - 1]
+    return result, cost, order
@@ -0,0 +1,100 @@
+"""Matrix products split across processes by row blocks of the result.
+
+A and B are copied once into shared memory. The result matrix is allocated
+there too, so workers read their operands and write their rows in place
+and nothing but block offsets is pickled. NumPy's int64 matmul runs on one
+core, which makes this the way to use the other cores for large integer
+products. Float products already use every core through BLAS.
+
+Engaged by matmul.multiply_arrays for integer products of at least
+PARALLEL_CONFIG['min_ops'] multiply-adds when more than one worker is
+configured; parallel_multiply can still be called directly for floats
+(e.g. with a single-threaded BLAS).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PARALLEL_CONFIG = {
+    'workers': int(os.environ.get('MATMUL_WORKERS', os.cpu_count() or 1)),
+    'min_ops': int(os.environ.get('MATMUL_PARALLEL_MIN_OPS', 256 ** 3)),
+}
+
+_executors = {}
+_executors_pid = None
+_executors_lock = threading.Lock()
+
+def get_executor(workers):
+    """Return this process's pool with `workers` processes, creating it after fork"""
+    global _executors, _executors_pid
+    with _executors_lock:
+        if _executors_pid != os.getpid():
+            _executors = {}
+            _executors_pid = os.getpid()
+        if workers not in _executors:
+            # Forking a threaded web worker is unsafe, so start children cleanly
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _executors[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _executors[workers]
+
+def discard_executor(workers, executor):
+    """Forget a broken pool (e.g. a worker was killed) so the next call starts a fresh one"""
+    with _executors_lock:
+        if _executors.get(workers) is executor:
+            del _executors[workers]
+    executor.shutdown(wait=False)
+
+def _multiply_block(names, shapes, dtype, start, stop):
+    """Worker: result[start:stop] = a[start:stop] @ b, all in shared memory"""
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        a, b, result = (np.ndarray(shape, dtype=dtype, buffer=shm.buf) for shm, shape in zip(blocks, shapes))
+        np.matmul(a[start:stop], b, out=result[start:stop])
+        del a, b, result
+    finally:
+        for shm in blocks:
+            shm.close()
+
+def parallel_multiply(a, b, workers=None):
+    """a @ b for 2-D NumPy arrays of one dtype computed by a process pool, or None if not worthwhile"""
+    workers = workers or PARALLEL_CONFIG['workers']
+    m, n = a.shape[0], b.shape[1]
+    workers = min(workers, m)
+    if np is None or workers < 2:
+        return None
+    dtype = np.result_type(a, b)
+
+    shms, views = [], []
+    try:
+        for shape, source in ((a.shape, a), (b.shape, b), ((m, n), None)):
+            shms.append(shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * dtype.itemsize)))
+            views.append(np.ndarray(shape, dtype=dtype, buffer=shms[-1].buf))
+            if source is not None:
+                np.copyto(views[-1], source)
+        names = [shm.name for shm in shms]
+        shapes = [a.shape, b.shape, (m, n)]
+        bounds = [m * i // workers for i in range(workers + 1)]
+        executor = get_executor(workers)
+        try:
+            futures = [executor.submit(_multiply_block, names, shapes, dtype.str, start, stop)
+                       for start, stop in zip(bounds, bounds[1:])]
+            for future in futures:
+                future.result()
+        except BrokenProcessPool:
+            discard_executor(workers, executor)
+            return None  # the caller multiplies serially
+        return views[2].copy()
+    finally:
+        views.clear()  # release the buffers before closing
+        for shm in shms:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,225 @@
+"""Sparse (CSR) matrices for the two_matrices app.
+
+Matrices that are mostly zeros are multiplied in time proportional to
+their nonzeros rather than m·k·n:
+
+* CSR × CSR    Gustavson's row-by-row algorithm, accumulating each result
+               row in a dict keyed by column
+* CSR × dense  each result row is the nonzeros of an A row times the
+               matching rows of B (one small NumPy product per row when
+               NumPy is available and the values fit in int64)
+
+JSON accepts {"format": "coo", "shape": [m, n], "row": [...], "col": [...],
+"data": [...]} or {"format": "csr", "shape": [m, n], "indptr": [...],
+"indices": [...], "data": [...]}.
+
+matmul.multiply also routes dense input here when measured density makes it
+cheaper (see multiply_auto).
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INT64_MAX = 2 ** 63 - 1
+
+# Thresholds on the share of nonzero entries, from benchmark.py --densities.
+# Integer products: CSR × dense beats the dense int64 product while A has
+# up to ~20% nonzeros, and CSR × CSR is faster still while B is very sparse
+SPARSE_MAX_DENSITY = 0.2
+SPARSE_CSR_MAX_DENSITY = 0.02
+# Float products go through BLAS, which only CSR × CSR of very sparse
+# operands can beat
+SPARSE_FLOAT_MAX_DENSITY = 0.01
+# Measuring density costs a pass over both inputs; skip it for small products
+SPARSE_MIN_OPS = 64 ** 3
+
+class CSRMatrix:
+    """Compressed sparse rows: row i's nonzeros are indices/data[indptr[i]:indptr[i + 1]]"""
+
+    def __init__(self, shape, indptr, indices, data):
+        self.shape = shape
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def density(self):
+        rows, cols = self.shape
+        return self.nnz / (rows * cols)
+
+    def rows(self):
+        """(columns, values) of each row"""
+        indptr, indices, data = self.indptr, self.indices, self.data
+        return [(indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]]) for i in range(self.shape[0])]
+
+    @classmethod
+    def from_dense(cls, matrix):
+        indptr, indices, data = [0], [], []
+        for row in matrix:
+            columns = [j for j, x in enumerate(row) if x]
+            indices += columns
+            data += [row[j] for j in columns]
+            indptr.append(len(data))
+        return cls((len(matrix), len(matrix[0])), indptr, indices, data)
+
+    @classmethod
+    def from_coo(cls, shape, row, col, data):
+        """Build from triplets; duplicates are summed and explicit zeros dropped"""
+        rows, cols = shape
+        merged = [{} for _ in range(rows)]
+        for i, j, x in zip(row, col, data):
+            if not (0 <= i < rows and 0 <= j < cols):
+                raise ValueError(f"Entry ({i}, {j}) is outside a {rows}×{cols} matrix")
+            merged[i][j] = merged[i].get(j, 0) + x
+        indptr, indices, values = [0], [], []
+        for entries in merged:
+            for j in sorted(entries):
+                if entries[j]:
+                    indices.append(j)
+                    values.append(entries[j])
+            indptr.append(len(values))
+        return cls(shape, indptr, indices, values)
+
+    @classmethod
+    def from_json(cls, obj, max_dim=None, max_nnz=None):
+        """Parse the COO or CSR JSON format; raises ValueError if malformed or over the limits
+
+        Both limits are checked before anything is allocated per row or entry.
+        """
+        try:
+            rows, cols = (int(x) for x in obj['shape'])
+            kind = obj.get('format')
+            data = obj['data']
+            if max_dim is not None and max(rows, cols) > max_dim:
+                raise ValueError(f"Matrix dimensions must be between 1 and {max_dim}")
+            if max_nnz is not None and len(data) > max_nnz:
+                raise ValueError(f"Sparse matrices may have at most {max_nnz} nonzero entries")
+            data = list(data)
+            if kind == 'coo':
+                row, col = list(obj['row']), list(obj['col'])
+                if not len(row) == len(col) == len(data):
+                    raise ValueError("row, col and data must have the same length")
+                indices_ok = all(type(x) is int for x in row + col)
+            elif kind == 'csr':
+                indptr, indices = list(obj['indptr']), list(obj['indices'])
+                indices_ok = all(type(x) is int for x in indptr + indices)
+            else:
+                raise ValueError('Sparse "format" must be "coo" or "csr"')
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed sparse matrix: {e}")
+        if rows < 1 or cols < 1:
+            raise ValueError("Matrices must not be empty")
+        if not indices_ok or not all(type(x) in (int, float) for x in data):
+            raise ValueError("Sparse indices must be integers and data numbers")
+        if kind == 'coo':
+            return cls.from_coo((rows, cols), row, col, data)
+        if (len(indptr) != rows + 1 or indptr[0] != 0 or indptr[-1] != len(data) or len(indices) != len(data)
+                or any(x > y for x, y in zip(indptr, indptr[1:]))
+                or any(not 0 <= j < cols for j in indices)):
+            raise ValueError("Inconsistent CSR arrays")
+        return cls((rows, cols), indptr, indices, data)
+
+    def to_json(self):
+        return {'format': 'csr', 'shape': list(self.shape), 'indptr': self.indptr,
+                'indices': self.indices, 'data': self.data}
+
+    def to_dense(self):
+        cols = self.shape[1]
+        dense = []
+        for columns, values in self.rows():
+            row = [0] * cols
+            for j, x in zip(columns, values):
+                row[j] = x
+            dense.append(row)
+        return dense
+
+def product_nnz_bound(a, b):
+    """Upper bound on the nonzeros of a × b for CSR matrices, from the row counts alone"""
+    n = b.shape[1]
+    b_counts = [end - start for start, end in zip(b.indptr, b.indptr[1:])]
+    return sum(min(n, sum(b_counts[k] for k in columns)) for columns, _ in a.rows())
+
+def multiply_csr(a, b, max_nnz=None):
+    """CSR × CSR -> CSR (Gustavson)
+
+    Raises ValueError up front if the product could have more than max_nnz
+    nonzeros.
+    """
+    if a.shape[1] != b.shape[0]:
+        raise ValueError(f"Cannot multiply {a.shape[0]}×{a.shape[1]} by {b.shape[0]}×{b.shape[1]}: "
+                         "inner dimensions differ")
+    if max_nnz is not None and product_nnz_bound(a, b) > max_nnz:
+        raise ValueError(f"The product could have more than {max_nnz} nonzero entries")
+    b_rows = b.rows()
+    indptr, indices, data = [0], [], []
+    for columns, values in a.rows():
+        acc = {}
+        get = acc.get
+        for k, x in zip(columns, values):
+            b_columns, b_values = b_rows[k]
+            for j, y in zip(b_columns, b_values):
+                acc[j] = get(j, 0) + x * y
+        for j in sorted(acc):
+            if acc[j]:
+                indices.append(j)
+                data.append(acc[j])
+        indptr.append(len(data))
+    return CSRMatrix((a.shape[0], b.shape[1]), indptr, indices, data)
+
+def multiply_csr_dense(a, b):
+    """CSR × dense (list of rows) -> dense list of rows"""
+    if a.shape[1] != len(b):
+        raise ValueError(f"Cannot multiply {a.shape[0]}×{a.shape[1]} by {len(b)}×{len(b[0])}: "
+                         "inner dimensions differ")
+    n = len(b[0])
+    rows = a.rows()
+    if np is not None and a.nnz:
+        is_float = any(type(x) is float for x in a.data) or any(type(x) is float for row in b for x in row)
+        try:
+            arr_b = np.array(b, dtype=np.float64 if is_float else np.int64)
+            max_a = max(abs(x) for x in a.data)
+            widest = max(len(columns) for columns, _ in rows)
+            max_b = max(int(arr_b.max()), -int(arr_b.min()))  # np.abs leaves -2**63 negative
+            if is_float or max_a * max_b * widest <= INT64_MAX:
+                zero = np.zeros(n, dtype=arr_b.dtype)
+                return [(np.array(values, dtype=arr_b.dtype) @ arr_b[columns]).tolist() if columns
+                        else zero.tolist() for columns, values in rows]
+        except OverflowError:
+            pass  # big integers: stay exact below
+    result = []
+    for columns, values in rows:
+        acc = [0] * n
+        for k, x in zip(columns, values):
+            acc = [s + x * y for s, y in zip(acc, b[k])]
+        result.append(acc)
+    return result
+
+def nonzero_share(matrix):
+    """Fraction of nonzero entries in a dense list of rows"""
+    return sum(len(row) - row.count(0) for row in matrix) / (len(matrix) * len(matrix[0]))
+
+def multiply_auto(a, b):
+    """Dense a × b through a sparse kernel when measured density makes that cheaper, else None"""
+    m, k, n = len(a), len(b), len(b[0])
+    if m * k * n < SPARSE_MIN_OPS:
+        return None
+    density_a = nonzero_share(a)
+    if density_a > SPARSE_MAX_DENSITY:
+        return None
+    density_b = nonzero_share(b)
+    csr_a = CSRMatrix.from_dense(a)
+    if density_b <= SPARSE_CSR_MAX_DENSITY:
+        csr_b = CSRMatrix.from_dense(b)
+        if (np is not None and max(density_a, density_b) > SPARSE_FLOAT_MAX_DENSITY
+                and any(type(x) is float for x in csr_a.data + csr_b.data)):
+            return None
+        return multiply_csr(csr_a, csr_b).to_dense()
+    if np is not None and (any(type(x) is float for x in csr_a.data)
+                           or any(type(x) is float for row in b for x in row)):
+        return None  # BLAS wins
+    return multiply_csr_dense(csr_a, b)
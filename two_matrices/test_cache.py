@@ -0,0 +1,16 @@
+"""Disk tier of cache.ResultCache (run from this directory: python -m pytest)"""
+import os
+import time
+
+from cache import ResultCache
+
+def test_disk_eviction_keeps_the_file_just_written(tmp_path):
+    cache = ResultCache(max_bytes=1, max_item_bytes=1, directory=str(tmp_path), disk_max_bytes=10)
+    cache.put('old', b'12345678')
+    # The older file looks newer, so age alone would evict the new one
+    future = time.time() + 60
+    os.utime(cache._path('old'), (future, future))
+    cache.put('new', b'87654321')
+    assert os.path.exists(cache._path('new'))
+    assert not os.path.exists(cache._path('old'))
+    assert cache.get('new') == b'87654321'
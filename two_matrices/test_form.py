@@ -0,0 +1,22 @@
+"""Parsing the matrix form (run from this directory: python -m pytest)"""
+import pytest
+
+from main import app, form_cells, parse_cells
+
+def pasted(text):
+    """Parse `text` as pasted into the Matrix A textarea"""
+    with app.test_request_context('/', method='POST', data={'a_text': text}):
+        size, cells, row_lengths = form_cells('a', 2)
+        return parse_cells(cells, size, 'A', row_lengths)
+
+def test_pasted_rows_keep_their_shape():
+    assert pasted("1 2\n3 4") == [[1, 2], [3, 4]]
+    assert pasted("1, 2\n3, 4") == [[1, 2], [3, 4]]
+
+@pytest.mark.parametrize('text', ["1 2 3\n4", "1\n2 3 4"])
+def test_ragged_rows_are_not_reflowed(text):
+    with pytest.raises(ValueError, match='row 1 of Matrix A'):
+        pasted(text)
+
+def test_beyond_int64_stays_exact():
+    assert parse_cells([str(2 ** 70), '1', '2', '3'], 2, 'A') == [[2 ** 70, 1], [2, 3]]
@@ -0,0 +1,31 @@
+"""Overflow handling in matmul (run from this directory: python -m pytest)"""
+import pytest
+
+import matmul
+
+# -2**63 has no positive int64 counterpart; the overflow check must still see it
+INT64_MIN_OVERFLOW = [[-2 ** 63, 0]], [[2], [0]]
+
+def test_int64_min_overflow_falls_back_to_exact():
+    assert matmul.multiply(*INT64_MIN_OVERFLOW) == [[-2 ** 64]]
+
+def test_int64_min_overflow_in_batches():
+    assert matmul.multiply_batch([INT64_MIN_OVERFLOW, INT64_MIN_OVERFLOW]) == [[[-2 ** 64]]] * 2
+
+def test_int64_min_overflow_is_refused_by_multiply_arrays():
+    np = pytest.importorskip('numpy')
+    with pytest.raises(OverflowError):
+        matmul.multiply_arrays(*(np.array(m, dtype=np.int64) for m in INT64_MIN_OVERFLOW))
+
+def test_int64_min_result_that_fits_is_accepted():
+    np = pytest.importorskip('numpy')
+    a, b = np.array([[-2 ** 63]], dtype=np.int64), np.array([[1]], dtype=np.int64)
+    assert matmul.multiply_arrays(a, b).tolist() == [[-2 ** 63]]
+    assert matmul.multiply_mode([[-2 ** 63]], [[1]], 'int64') == [[-2 ** 63]]
+    assert matmul.multiply_mode([[-2 ** 62, -2 ** 62]], [[1], [1]], 'int64') == [[-2 ** 63]]
+
+def test_signed_overflow_is_still_refused():
+    np = pytest.importorskip('numpy')
+    for a, b in (([[-2 ** 63]], [[-1]]), ([[2 ** 62, 2 ** 62]], [[-2], [-1]])):
+        with pytest.raises(OverflowError):
+            matmul.multiply_arrays(np.array(a, dtype=np.int64), np.array(b, dtype=np.int64))